@@ -0,0 +1,46 @@
+"""Micro-benchmark for attribute access on InstanceResource
+
+Times hydrating a Call from page data, reading a schema attribute, reading an
+alias (from_number), setting a create param and looking up a subresource list.
+
+Usage: python benchmarks/attribute_access.py [path to a telapi-python checkout]
+"""
+import json
+import os
+import sys
+import timeit
+
+CHECKOUT = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, CHECKOUT)
+
+from telapi import rest
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'mock-response', 'view-call.json')
+NUMBER = 100000
+
+
+def main():
+    call_data = json.load(open(FIXTURE))
+    client = rest.Client("AC" + "X" * 32, "X" * 32)
+    calls = client.accounts[client.account_sid].calls
+    call = calls.new(fetched_data=call_data)
+    account = client.accounts[client.account_sid]
+    account._populated = True
+
+    cases = (
+        ("hydrate", lambda: calls.new(fetched_data=call_data)),
+        ("get attribute", lambda: call.status),
+        ("get alias", lambda: call.from_number),
+        ("set attribute", lambda: setattr(call, "url", "http://example.com")),
+        ("set alias", lambda: setattr(call, "to_number", "+15555555555")),
+        ("subresource", lambda: account.calls),
+    )
+
+    print CHECKOUT
+    for label, case in cases:
+        seconds = min(timeit.repeat(case, number=NUMBER, repeat=3)) / NUMBER
+        print "%-16s %12.0f ops/s" % (label, 1 / seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Measures how long `import telapi.rest` and a first resource lookup take in a fresh interpreter
+
+Usage: python benchmarks/import_time.py [path to a telapi-python checkout]
+"""
+import os
+import subprocess
+import sys
+
+RUNS = 50
+
+SNIPPET = """
+import sys, time
+sys.path.insert(0, %r)
+import requests
+started = time.time()
+import telapi.rest
+imported = time.time()
+client = telapi.rest.Client("AC" + "X" * 32, "X" * 32)
+client.accounts["AC" + "X" * 32].sms_messages
+print imported - started, time.time() - imported
+"""
+
+
+def main():
+    checkout = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..'))
+    samples = []
+
+    for i in range(RUNS):
+        output = subprocess.check_output([sys.executable, "-c", SNIPPET % checkout])
+        samples.append(map(float, output.split()))
+
+    samples.sort()
+    import_time, first_use = samples[len(samples) // 2]
+    print "%s: import %.2fms, first resource %.2fms (median of %d)" % (checkout, import_time * 1000, first_use * 1000, RUNS)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Micro-benchmark for building and rendering InboundXML responses
+
+Times constructing and str() on a small response (a Gather wrapping a Say)
+and on a large IVR response with hundreds of nested elements. Where the
+checkout supports them, also times a write() of the large one to a file-like
+buffer, the large one built from frozen menus, rendering the small one from
+a precompiled Template and parsing the large one back.
+
+Usage: python benchmarks/inboundxml_render.py [path to a telapi-python checkout]
+"""
+import os
+import sys
+import timeit
+from StringIO import StringIO
+
+CHECKOUT = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, CHECKOUT)
+
+from telapi import inboundxml
+
+
+def small_response():
+    return inboundxml.Response(
+        inboundxml.Gather(
+            inboundxml.Say('Press 1 for sales, 2 for support', voice='woman'),
+            action='http://example.com/menu', numDigits=1))
+
+
+def large_response(menus=100):
+    response = inboundxml.Response()
+
+    for i in xrange(menus):
+        response.append(inboundxml.Gather(
+            inboundxml.Say('Menu %d, press 1 to continue & 2 to go back' % i, voice='woman', loop=1),
+            inboundxml.Play('http://example.com/hold-%d.mp3' % i),
+            inboundxml.Pause(length=1),
+            action='http://example.com/menu/%d?from=ivr&step=%d' % (i, i), method='POST', numDigits=1))
+        response.append(inboundxml.Dial(inboundxml.Number('+1555000%04d' % i), callerId='+15550001111'))
+
+    return response
+
+
+def main():
+    small = small_response()
+    large = large_response()
+
+    cases = [
+        ("small build", small_response, 20000),
+        ("large build", large_response, 200),
+        ("small str()", lambda: str(small), 20000),
+        ("large str()", lambda: str(large), 200),
+    ]
+
+    if hasattr(large, 'write'):
+        cases.append(("large write()", lambda: large.write(StringIO()), 200))
+
+    if hasattr(large, 'freeze'):
+        frozen = inboundxml.Response(*[child.freeze() for child in large_response()._children])
+        cases.append(("large frozen", lambda: str(frozen), 200))
+
+    if hasattr(inboundxml, 'Template'):
+        template = inboundxml.Response(
+            inboundxml.Gather(
+                inboundxml.Say(inboundxml.Placeholder('prompt'), voice='woman'),
+                action=inboundxml.Placeholder('action'), numDigits=1)).compile()
+        values = {'prompt': 'Press 1 for sales, 2 for support', 'action': 'http://example.com/menu'}
+
+        cases.append(("small template", lambda: template.render(**values), 20000))
+
+    if hasattr(inboundxml, 'parse'):
+        xml = str(large)
+        cases.append(("large parse", lambda: inboundxml.parse(xml), 200))
+
+    print CHECKOUT
+    for label, case, number in cases:
+        seconds = min(timeit.repeat(case, number=number, repeat=7)) / number
+        print "%-16s %10.1f us" % (label, seconds * 1e6)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Compares the JSON decoders available to telapi.rest.decoder.JSONDecoder
+
+Decodes every fixture in tests/mock-response, plus a 1000-item list page built
+from list-calls.json, with each backend that is installed.
+
+Usage: python benchmarks/json_decoding.py
+"""
+import glob
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from telapi.rest import decoder
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'mock-response')
+
+
+def main():
+    documents = [(os.path.basename(path), open(path, 'rb').read()) for path in sorted(glob.glob(os.path.join(FIXTURES, '*.json')))]
+
+    page = json.load(open(os.path.join(FIXTURES, 'list-calls.json')))
+    page["calls"] = [dict(page["calls"][i % 3], sid="CA%032d" % i) for i in range(1000)]
+    documents.append(("1000-call page", json.dumps(page)))
+
+    backends = [("json", json)] + [(name, module) for name, module in (("simplejson", decoder.simplejson), ("ujson", decoder.ujson)) if module]
+
+    print "%-24s %10s" % ("document", "bytes") + "".join("%14s" % name for name, module in backends)
+    for name, content in documents:
+        row = "%-24s %10d" % (name, len(content))
+
+        for backend_name, module in backends:
+            decode = decoder.JSONDecoder(backend=module).decode
+            number = max(1, 2000000 // len(content))
+            seconds = min(timeit.repeat(lambda: decode(content), number=number, repeat=3)) / number
+            row += "%9.1f MB/s" % (len(content) / seconds / 1e6)
+
+        print row
+
+
+if __name__ == '__main__':
+    main()
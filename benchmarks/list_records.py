@@ -0,0 +1,47 @@
+"""Compares hydrating list items into InstanceResources and into read-only Records
+
+Reports construction rate and approximate memory per item for a page built from
+tests/mock-response/list-calls.json.
+
+Usage: python benchmarks/list_records.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from telapi import rest
+
+PAGE_SIZE = 1000
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'mock-response', 'list-calls.json')
+
+
+def size_of(obj):
+    """Size of an object and its instance dict, not counting the values they share with the page"""
+    size = sys.getsizeof(obj)
+
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+
+    return size
+
+
+def main():
+    calls_json = json.load(open(FIXTURE))["calls"]
+    items = [dict(calls_json[i % len(calls_json)], sid="CA%032d" % i) for i in range(PAGE_SIZE)]
+
+    client = rest.Client("AC" + "X" * 32, "X" * 32)
+    calls = client.accounts[client.account_sid].calls
+
+    for label, records in (("InstanceResource", False), ("Record", True)):
+        hydrate = calls._hydrator(records)
+        seconds = min(timeit.repeat(lambda: [hydrate(item) for item in items], number=5, repeat=5)) / 5
+        memory = sum(size_of(hydrate(item)) for item in items) / float(len(items))
+
+        print "%-16s %10.0f items/s %8.0f bytes/item" % (label, len(items) / seconds, memory)
+
+
+if __name__ == '__main__':
+    main()
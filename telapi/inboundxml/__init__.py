@@ -1,26 +1,75 @@
-from xml.sax.saxutils import escape
+import re
 from new import classobj
 from telapi.schema import SCHEMA
 
+# Pieces of XML collected before they are encoded and passed on by Element.write()
+_CHUNK_PIECES = 1024
+
+
+_SPECIAL = re.compile(u'[&<>"]')
+
+
+def _escape(text):
+    if _SPECIAL.search(text) is None:
+        return text
+
+    return text.replace(u'&', u'&amp;').replace(u'<', u'&lt;').replace(u'>', u'&gt;')
+
+
+def _escape_attribute(text):
+    # Attribute values are written in double quotes
+    if _SPECIAL.search(text) is None:
+        return text
+
+    return _escape(text).replace(u'"', u'&quot;')
+
+
+class Placeholder(object):
+    """Stands in for a body or attribute value that is filled in when a `Template` is rendered"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __unicode__(self):
+        raise ValueError('Placeholder "%s" has no value, compile the element into a Template to fill it in' %
+            self.name)
+
+    def __repr__(self):
+        return 'Placeholder(%r)' % self.name
+
+
+_set_slot = object.__setattr__
+
+_ATTRIBUTE_ALIASES = {
+    "from_number"   : "from",
+    "to_number"     : "to",
+}
+
 
 class Element(object):
     """Root XML element. Also, base class for all other InboundXML elements"""
 
-    _allowed_attributes = []
-    _allowed_children   = []
+    # `_frozen`, `_xml` and `_xml_text` are set by freeze(), the XML as UTF-8 bytes
+    # and as text for splicing into a parent's
+    __slots__ = ('_body', '_attributes', '_children', '_frozen', '_xml', '_xml_text')
+
+    _element_name       = 'Element'
+    _allowed_attributes = frozenset()
+    _allowed_children   = frozenset()
     _allow_blank        = False
 
     def __init__(self, *args, **kwargs):
-        object.__init__(self)
-
-        self._element_name = self.__class__.__name__.split('.')[-1]
-        self._body         = ''
-        self._attributes   = {}
-        self._children     = []
+        # Straight to the slots, __setattr__ is for the XML attributes
+        _set_slot(self, '_body', '')
+        _set_slot(self, '_attributes', {})
+        _set_slot(self, '_children', [])
+        _set_slot(self, '_frozen', False)
+        _set_slot(self, '_xml', None)
+        _set_slot(self, '_xml_text', None)
 
         for i, arg in enumerate(args):
-            if i == 0 and isinstance(arg, basestring):
-                self._body = arg
+            if i == 0 and isinstance(arg, (basestring, Placeholder)):
+                _set_slot(self, '_body', arg)
             elif isinstance(arg, Element):
                 self._children.append(arg)
 
@@ -28,21 +77,103 @@ class Element(object):
             setattr(self, k, v)
 
     def __str__(self):
-        return str(unicode(self))
+        """The element as UTF-8 encoded XML"""
+        if self._xml is not None:
+            return self._xml
+
+        chunks = []
+        self._serialize(chunks.append)
+
+        return ''.join(chunks)
 
     def __unicode__(self):
-        attribute_string = ''
-        body_string = ''.join([unicode(child) for child in self._children]) or escape(unicode(self._body))
+        return str(self).decode('utf-8')
+
+    def write(self, target):
+        """Writes the element as UTF-8 encoded XML to `target`
+
+        `target` is a file-like object (anything with `write`) or a list, e.g.
+        the body of a WSGI response. Raises ValueError for a blank element,
+        after the XML ahead of it has been written.
+        """
+        self._serialize(target.write if hasattr(target, 'write') else target.append)
 
-        if not self._allow_blank and not body_string.strip():
-            raise ValueError('The "%s" element cannot be blank!' % 
-                self._element_name)
+    def _serialize(self, write):
+        """Passes the XML of this element and everything below it to `write` as UTF-8 chunks
 
-        if len(self._attributes):
-            attribute_string = ' ' + ' '.join(['%s="%s"' % (escape(unicode(k)), escape(unicode(v))) 
-                for k, v in self._attributes.items()])
+        Walks the tree with a stack rather than recursion, checking for blank
+        elements on the way, and encodes about every `_CHUNK_PIECES` pieces.
+        """
+        pieces = []
+        append = pieces.append
+        stack  = [self]
+        pop    = stack.pop
 
-        return u"<%s%s>%s</%s>" % (self._element_name, attribute_string, body_string, self._element_name)
+        while stack:
+            element = pop()
+
+            # Closing tags of elements with children are pushed as finished strings
+            if element.__class__ is unicode:
+                append(element)
+                continue
+
+            if element._xml_text is not None:
+                append(element._xml_text)
+                continue
+
+            name = element._element_name
+            children = element._children
+
+            if element._attributes:
+                append(u'<%s %s>' % (name, u' '.join([u'%s="%s"' % (k, _escape_attribute(unicode(v)))
+                    for k, v in element._attributes.items()])))
+            else:
+                append(u'<%s>' % name)
+
+            if children:
+                stack.append(u'</%s>' % name)
+                stack.extend(reversed(children))
+            else:
+                body = unicode(element._body)
+
+                if not element._allow_blank and not body.strip():
+                    raise ValueError('The "%s" element cannot be blank!' % name)
+
+                append(u'%s</%s>' % (_escape(body), name))
+
+            if len(pieces) >= _CHUNK_PIECES:
+                write(u''.join(pieces).encode('utf-8'))
+                del pieces[:]
+
+        write(u''.join(pieces).encode('utf-8'))
+
+    def freeze(self):
+        """Makes this element and everything below it immutable, and keeps its XML
+
+        Setting or deleting attributes and appending children then raise.
+        Rendering a frozen element, on its own or inside a mutable parent,
+        reuses the XML serialized here. Returns the element.
+        """
+        xml = str(self)
+        stack = [self]
+
+        while stack:
+            element = stack.pop()
+            element._frozen = True
+            stack.extend(element._children)
+
+        self._xml      = xml
+        self._xml_text = xml.decode('utf-8')
+
+        return self
+
+    def _ensure_mutable(self):
+        if self._frozen:
+            raise AttributeError('The "%s" element is frozen!' % self._element_name)
+
+    def compile(self):
+        """Returns a `Template` of this element, for rendering it over and over with different values"""
+        return Template(self)
 
     def _ensure_attribute(self, name):
         if name not in self._allowed_attributes:
@@ -57,29 +188,28 @@ class Element(object):
     def __setattr__(self, name, value):
 
         # From is a reserved keyword so we need to map it to from_number
-        if name == "from_number":
-            name = "from"
-        elif name == "to_number":
-            name = "to"
-            
-        if name.startswith('_'):
-            object.__setattr__(self, name, value)
+        name = _ATTRIBUTE_ALIASES.get(name, name)
+
+        if name[0] == '_':
+            _set_slot(self, name, value)
             return
 
+        if self._frozen:
+            self._ensure_mutable()
+
         if name == 'body':
-            self._body = value
+            _set_slot(self, '_body', value)
             return
 
-        self._ensure_attribute(name)
+        if name not in self._allowed_attributes:
+            self._ensure_attribute(name)
+
         self._attributes[name] = value
             
     def __getattr__(self, name):
 
         # From is a reserved keyword so we need to map it to from_number
-        if name == "from_number":
-            name = "from"
-        elif name == "to_number":
-            name = "to"
+        name = _ATTRIBUTE_ALIASES.get(name, name)
 
         if name == 'body':
             return self._body
@@ -92,12 +222,16 @@ class Element(object):
             return None
 
     def __delattr__(self, name):
+        self._ensure_mutable()
         self._ensure_attribute(name)
 
         if name in self._attributes:
-            del self._attributes
+            del self._attributes[name]
 
     def append(self, child):
+        if self._frozen:
+            raise TypeError('The "%s" element is frozen!' % self._element_name)
+
         self._ensure_child(child._element_name)
         self._children.append(child)
 
@@ -118,11 +252,15 @@ for element, properties in SCHEMA['inboundxml']['verbs'].items():
     )
 
     element_dict = {
-        '_allowed_attributes'   : properties['attributes'],
-        '_allowed_children'     : properties['nesting'],
+        '_element_name'         : str(element),
+        '_allowed_attributes'   : frozenset(properties['attributes']),
+        '_allowed_children'     : frozenset(properties['nesting']),
         '_allow_blank'          : properties['blank'],
         '__doc__'               : docstring,
+        '__slots__'             : (),
     }
     globals()[str(element)] = classobj(str(element), (Element,), element_dict)
 
 
+from template import Template
+from parser import parse, iterparse
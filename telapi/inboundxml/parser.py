@@ -0,0 +1,164 @@
+import xml.parsers.expat
+
+from telapi.schema import SCHEMA
+
+# Bytes read from a file per call to the parser
+READ_SIZE = 65536
+
+
+class _TreeBuilder(object):
+    """Turns expat callbacks into Element objects, validating them against the schema
+
+    With `detach` set, children of the root element are not attached to it,
+    so only the verb being parsed is held in memory.
+    """
+
+    def __init__(self, detach=False, report_start=False):
+        from telapi import inboundxml
+
+        self.classes      = dict((name, getattr(inboundxml, str(name))) for name in SCHEMA['inboundxml']['verbs'])
+        self.detach       = detach
+        self.report_start = report_start
+        self.events       = []
+        self.root         = None
+        self._stack       = []
+
+    def start(self, name, attributes):
+        element_class = self.classes.get(name)
+        if element_class is None:
+            raise TypeError('"%s" is not an InboundXML element!' % name)
+
+        element = element_class()
+
+        if attributes:
+            allowed = element_class._allowed_attributes
+            for attribute in attributes:
+                if attribute not in allowed:
+                    element._ensure_attribute(attribute)
+
+            element._attributes.update(attributes)
+
+        stack = self._stack
+        if stack:
+            parent = stack[-1]
+            if name not in parent[0]._allowed_children:
+                parent[0]._ensure_child(name)
+
+            parent[2] += 1
+
+            if not (self.detach and len(stack) == 1):
+                parent[0]._children.append(element)
+        else:
+            self.root = element
+
+        # The element, its text and how many children it has
+        stack.append([element, [], 0])
+
+        if self.report_start:
+            self.events.append(("start", element))
+
+    def end(self, name):
+        element, text, children = self._stack.pop()
+        text = u''.join(text)
+
+        if children:
+            # Whitespace between child elements is formatting, InboundXML has no mixed content
+            if text.strip():
+                raise ValueError('The "%s" element has both text and child elements!' % name)
+        else:
+            if not element._allow_blank and not text.strip():
+                raise ValueError('The "%s" element cannot be blank!' % name)
+
+            element._body = text
+
+        self.events.append(("end", element))
+
+    def data(self, text):
+        self._stack[-1][1].append(text)
+
+
+def _parser(builder):
+    parser = xml.parsers.expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = builder.start
+    parser.EndElementHandler = builder.end
+    parser.CharacterDataHandler = builder.data
+
+    return parser
+
+
+def _chunks(source):
+    """The XML in `source` (a string or a file-like object) as byte strings"""
+    if isinstance(source, unicode):
+        source = source.encode('utf-8')
+
+    if isinstance(source, str):
+        for start in xrange(0, len(source), READ_SIZE):
+            yield source[start:start + READ_SIZE]
+        return
+
+    while True:
+        chunk = source.read(READ_SIZE)
+        if not chunk:
+            return
+
+        yield chunk.encode('utf-8') if isinstance(chunk, unicode) else chunk
+
+
+def parse(source):
+    """Loads InboundXML from a string or a file-like object into Element objects
+
+    Elements, attributes and nesting are validated against the schema as they
+    are read, raising the same errors as building the tree by hand, and blank
+    elements raise ValueError. Malformed XML raises `xml.parsers.expat.ExpatError`.
+    Returns the root element.
+
+    Serializing the result gives back equivalent XML, not the same bytes: the
+    `<?xml ?>` declaration, comments and formatting whitespace between
+    elements are dropped, attributes may come out in a different order,
+    CDATA sections and entities such as `&apos;` are written as escaped text
+    and empty elements like `<Pause/>` get an end tag.
+    """
+    builder = _TreeBuilder()
+    parser = _parser(builder)
+
+    for chunk in _chunks(source):
+        parser.Parse(chunk, False)
+        del builder.events[:]
+
+    parser.Parse('', True)
+
+    return builder.root
+
+
+def iterparse(source, events=("end",)):
+    """Parses InboundXML incrementally, yielding ``(event, element)`` pairs
+
+    An "end" event comes as soon as an element and its children have been
+    read; pass ``events=("start", "end")`` to also get a "start" event, with
+    just the attributes set, as each element begins. The verbs directly under
+    the root element are not attached to it, so memory use is bounded by the
+    largest verb rather than the whole document. Validation is the same as
+    for `parse`.
+    """
+    builder = _TreeBuilder(detach=True, report_start="start" in events)
+    parser = _parser(builder)
+    report_end = "end" in events
+
+    def drain():
+        for event in builder.events:
+            if event[0] == "start" or report_end:
+                yield event
+
+        del builder.events[:]
+
+    for chunk in _chunks(source):
+        parser.Parse(chunk, False)
+
+        for event in drain():
+            yield event
+
+    parser.Parse('', True)
+
+    for event in drain():
+        yield event
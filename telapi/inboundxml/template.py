@@ -0,0 +1,125 @@
+from telapi.schema import SCHEMA
+from telapi.inboundxml import Placeholder, _escape, _escape_attribute
+
+
+class Template(object):
+    """An element tree serialized ahead of time, with `Placeholder`s left to fill in
+
+    The tree is checked against the InboundXML schema once, when the template
+    is compiled. Rendering only escapes the placeholder values and splices them
+    between the precomputed UTF-8 pieces:
+
+        menu = Response(Gather(Say(Placeholder('prompt')), action=Placeholder('action'))).compile()
+        menu.render(prompt='Press 1 for sales', action='http://example.com/menu')
+
+    Placeholders in the body of an element that can't be blank must not be
+    given a blank value.
+    """
+
+    def __init__(self, element):
+        self._static = []
+        self._slots  = []
+
+        self._compile(element)
+
+        # Names of the placeholders render() needs values for
+        self.names = frozenset(slot[0] for slot in self._slots)
+
+    def _compile(self, root):
+        verbs  = SCHEMA['inboundxml']['verbs']
+        pieces = []
+        stack  = [root]
+
+        def add_slot(placeholder, escape, element_name, required):
+            self._static.append(u''.join(pieces).encode('utf-8'))
+            self._slots.append((placeholder.name, escape, element_name, required))
+            del pieces[:]
+
+        while stack:
+            element = stack.pop()
+
+            if element.__class__ is unicode:
+                pieces.append(element)
+                continue
+
+            # Frozen subtrees were validated and serialized when they were frozen
+            if element._xml_text is not None:
+                pieces.append(element._xml_text)
+                continue
+
+            name = element._element_name
+            if name not in verbs:
+                raise TypeError('"%s" is not an InboundXML element!' % name)
+
+            properties = verbs[name]
+            children = element._children
+
+            for attribute in element._attributes:
+                if attribute not in properties['attributes']:
+                    raise AttributeError('"%s" is not a valid attribute of the "%s" element!' % (attribute, name))
+
+            for child in children:
+                if child._element_name not in properties['nesting']:
+                    raise TypeError('"%s" is not a valid child element of the "%s" element!' %
+                        (child._element_name, name))
+
+            pieces.append(u'<%s' % name)
+            for attribute, value in element._attributes.items():
+                pieces.append(u' %s="' % attribute)
+
+                if isinstance(value, Placeholder):
+                    add_slot(value, _escape_attribute, name, False)
+                else:
+                    pieces.append(_escape_attribute(unicode(value)))
+
+                pieces.append(u'"')
+            pieces.append(u'>')
+
+            if children:
+                stack.append(u'</%s>' % name)
+                stack.extend(reversed(children))
+                continue
+
+            body = element._body
+            if isinstance(body, Placeholder):
+                add_slot(body, _escape, name, not properties['blank'])
+            else:
+                body = unicode(body)
+
+                if not properties['blank'] and not body.strip():
+                    raise ValueError('The "%s" element cannot be blank!' % name)
+
+                pieces.append(_escape(body))
+
+            pieces.append(u'</%s>' % name)
+
+        self._static.append(u''.join(pieces).encode('utf-8'))
+
+    def render(self, **values):
+        """The XML with `values` filled in for the placeholders, as UTF-8 encoded bytes
+
+        Raises KeyError for a placeholder without a value.
+        """
+        static = self._static
+        chunks = [static[0]]
+
+        for i, (name, escape, element_name, required) in enumerate(self._slots):
+            value = values[name]
+            value = value if value.__class__ is unicode else unicode(value)
+
+            if required and not value.strip():
+                raise ValueError('The "%s" element cannot be blank!' % element_name)
+
+            chunks.append(escape(value).encode('utf-8'))
+            chunks.append(static[i + 1])
+
+        return ''.join(chunks)
+
+    def write(self, target, **values):
+        """Writes the rendered XML to a file-like object or appends it to a list, like `Element.write`"""
+        xml = self.render(**values)
+
+        if hasattr(target, 'write'):
+            target.write(xml)
+        else:
+            target.append(xml)
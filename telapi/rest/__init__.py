@@ -2,34 +2,102 @@ import os
 import sys
 import exceptions
 import requests
-import platform
+import requests.adapters
+import time
+import threading
+import Queue
+import itertools
+import collections
+import types
 from new import classobj
-import json
 from telapi.schema import SCHEMA
+from telapi.utils import memoized
 from telapi import VERSION
+from executor import Executor, Future, gather
+from retry import RetryPolicy
+from ratelimit import RateLimiter, TokenBucket, FileTokenBucket
+from cache import ResponseCache
+from decoder import JSONDecoder
+from streaming import PageStream
+from export import export_pages
+from columns import collect_columns
+from sync import SyncState, iter_changes
+from mirror import Mirror
+from identity import IdentityMap
+from singleflight import SingleFlight
 
 __ALL__ = ['exceptions']
 
 
-USER_AGENT = "TelAPI-Python/%s (%s %s)" % (VERSION, platform.system(), platform.release())
+# platform.system() runs `uname -p` in a subprocess, so prefer os.uname() where it exists
+if hasattr(os, "uname"):
+    USER_AGENT = "TelAPI-Python/%s (%s %s)" % (VERSION, os.uname()[0], os.uname()[2])
+else:
+    import platform
+    USER_AGENT = "TelAPI-Python/%s (%s %s)" % (VERSION, platform.system(), platform.release())
 
+# Largest PageSize accepted by the API
+MAX_PAGE_SIZE = 1000
 
-def _name_to_instance_class_name(resource_name):
-    return str(resource_name)
 
-def _name_to_instance_class(resource_name):
-    return globals()[_name_to_instance_class_name(resource_name)]
+def _name_to_instance_class_name(resource_name, prefix=""):
+    return prefix + str(resource_name)
 
-def _name_to_list_class_name(resource_name):
-    return str(resource_name) + "ListResource"
+def _name_to_instance_class(resource_name, prefix=""):
+    return _resource_class(_name_to_instance_class_name(resource_name, prefix), resource_name, prefix)
 
-def _name_to_list_class(resource_name):
-    return globals()[_name_to_list_class_name(resource_name)]
+def _name_to_list_class_name(resource_name, prefix=""):
+    return prefix + str(resource_name) + "ListResource"
+
+def _name_to_list_class(resource_name, prefix=""):
+    return _resource_class(_name_to_list_class_name(resource_name, prefix), resource_name, prefix)
+
+def _name_to_record_class_name(resource_name):
+    return str(resource_name) + "Record"
+
+def _name_to_record_class(resource_name):
+    return _resource_class(_name_to_record_class_name(resource_name), resource_name, "")
+
+@memoized
+def _components_by_name():
+    """Maps a resource name (e.g. "Call") to its ``(element, properties)`` in the schema"""
+    return dict((properties["name"], (element, properties)) for element, properties in SCHEMA["rest_api"]["components"].items())
+
+@memoized
+def _subresources_by_parent():
+    """Maps a component to the ``{element: resource name}`` of the lists nested under it"""
+    subresources = {}
+
+    for element, properties in SCHEMA["rest_api"]["components"].items():
+        for parent in properties["parent_resources"]:
+            subresources.setdefault(parent, {})[element] = properties["name"]
+
+    return subresources
+
+_resource_class_lock = threading.Lock()
+
+def _resource_class(class_name, resource_name, prefix):
+    """Returns a generated resource class, creating its component's classes on first use"""
+    resource_class = globals().get(class_name)
+
+    if resource_class is None:
+        with _resource_class_lock:
+            if class_name not in globals():
+                element, properties = _components_by_name()[resource_name]
+                _create_resource_classes(element, properties, prefix)
+
+        resource_class = globals()[class_name]
+
+    return resource_class
 
 
 
 class Resource(object):
     """Base class for InstanceResource and ListResource"""
+
+    # Prefix of the generated class names this resource's children are looked up by
+    _class_prefix = ""
+
     def __init__(self, parent):
         self._parent        = parent
         self._full_url      = None
@@ -61,6 +129,37 @@ class Resource(object):
 
 
 
+def _page_windows(start, stop, step=1, max_page_size=None):
+    """Returns the fewest ``(page, page_size)`` windows covering rows ``xrange(start, stop, step)``
+
+    Ties are broken on the number of rows downloaded, so ``[9900:10000]`` maps onto
+    ``?Page=99&PageSize=100`` rather than fetching the first 10,000 rows, and
+    ``[0:100000:1000]`` fetches each of its 100 rows on its own.
+    """
+    if stop <= start:
+        return []
+
+    best = None
+
+    for page_size in xrange(1, (max_page_size or MAX_PAGE_SIZE) + 1):
+        first_page, last_page = start // page_size, (stop - 1) // page_size
+        num_pages = last_page - first_page + 1
+        cost = (num_pages, num_pages * page_size)
+
+        if best is None or cost < best[0]:
+            best = (cost, page_size, first_page, last_page)
+
+    cost, page_size, first_page, last_page = best
+
+    # Rows a step apart can each be fetched with PageSize=1 instead of with the rows between them
+    rows = xrange(start, stop, step)
+    if (len(rows), len(rows)) < cost:
+        return [(row, 1) for row in rows]
+
+    return [(page, page_size) for page in xrange(first_page, last_page + 1)]
+
+
+
 class ListResourceMetaclass(type):
     def __new__(meta, classname, bases, classDict):
         return type.__new__(meta, classname, bases, classDict)
@@ -74,12 +173,13 @@ class ListResource(Resource):
         self.page_size = page_size
         self.total     = 0
         self.num_pages = 0
-        self.start     = 0
-        self.end       = sys.maxint
-        self.step      = 1
-        self.current   = 0
         self._filters  = {}
         self._total    = None
+        self._window   = None
+        self._lock     = threading.Lock()
+
+        self.page_latencies = []
+        self.create_stats   = {}
         
 
     def __getitem__(self, key):
@@ -87,15 +187,12 @@ class ListResource(Resource):
         if isinstance(key, int):
             # TODO: Cache length so it's not calulated every time
 
-            self.fetch()
+            self._fetch()
 
             if not self.total:
                 raise IndexError()
 
-            if self._short_name == 'local' or self._short_name == 'tollfree':
-                self._short_name = 'available_phone_numbers'
-
-            resource_list = self._resource_data[self._short_name]
+            resource_list = self._resource_data[self._list_key]
 
             # Negative index
             if key < 0:
@@ -103,109 +200,180 @@ class ListResource(Resource):
 
             nth_item = resource_list[key]
 
-            return _name_to_instance_class(self._name)(parent=self, fetched_data=nth_item)
+            return _name_to_instance_class(self._name, self._class_prefix)(parent=self, fetched_data=nth_item)
 
         # Extended slice
         # Paginate
         elif isinstance(key, slice):
-            # TODO: Support negative indexing for slices
+            paginated_list_resource         = self.copy()
+            paginated_list_resource._window = self._slice_window(key)
 
-            # TODO: Temporarily fetching n results where n is the slice end and then performing the slice
-            # It is inefficient since 90:100 will fetch all first 100 rows
+            # Reuse rows that are already on the fetched page instead of requesting them again
+            if self._populated and not self._window:
+                rows = xrange(*paginated_list_resource._window)
+                if not rows or (self._page_start <= min(rows[0], rows[-1]) and max(rows[0], rows[-1]) <= self._page_end):
+                    resource_list = self._resource_data[self._list_key]
+                    paginated_list_resource._populate_window([resource_list[i - self._page_start] for i in rows])
 
-            # # Map slice to page & page size e.g. [10:20] -> ?Page=1&PageSize=10
-            # # Trouble when it"s not nice and even, such as [15:50] -> ?Page=0&PageSize=50, then we have to slice the results [15:50], discarding the first 15
-            #
-            # diff = key.stop - key.start
-            # if diff < key.start:
-            #     page_size = diff
-            # else:
-            #     page_size = key.start + key.stop
+            return paginated_list_resource
 
-            page = 0
-            page_size = key.stop
+        # Lookup by SID, handing back the same object for as long as it is in use
+        else:
+            return self._client.identity_map.get(self._url + "/" + key, lambda: self._instance_for_sid(key))
 
-            # If page & page size are the same, return slice, else return a new list resource
-            if self.page == page and self.page_size == page_size:
-                indices = key.indices(len(self))
+        return IndexError()
 
-                return [self[i] for i in indices]
-            else:
-                # The pages are different, so we can"t use the data (if any) already fetched
-                paginated_list_resource           = self.copy()
-                paginated_list_resource.page      = page
-                paginated_list_resource.page_size = page_size
-                paginated_list_resource.start     = key.start
-                paginated_list_resource.end       = key.stop
-                paginated_list_resource.step      = key.step or 1
+    def _instance_for_sid(self, sid):
+        instance_class = _name_to_instance_class(self._name, self._class_prefix)
 
-                return paginated_list_resource
+        if self._populated:
+            for item in self._resource_data[self._list_key]:
+                if item["sid"] == sid:
+                    return instance_class(parent=self, fetched_data=item)
 
-        # Lookup by SID
+        return instance_class(parent=self, sid=sid)
+
+    @property
+    def _list_key(self):
+        # Local and toll-free numbers are listed under their parent's key
+        if self._short_name == 'local' or self._short_name == 'tollfree':
+            return 'available_phone_numbers'
+
+        return self._short_name
+
+    def _slice_window(self, key):
+        """Maps a slice onto absolute row positions as a ``(start, stop, step)`` tuple"""
+        if self._window:
+            base_start, base_stop, base_step = self._window
+            length = len(xrange(base_start, base_stop, base_step))
         else:
-            if self._populated:
-                for item in self._resource_data[self._short_name]:
-                    if item["sid"] == key:
-                        return _name_to_instance_class(self._name)(parent=self, fetched_data=item)
+            base_start, base_step = 0, 1
+
+            # Only negative or open-ended slices need to know how many rows there are
+            if key.stop is None or (key.start or 0) < 0 or key.stop < 0 or (key.step or 1) < 0:
+                length = self._count()
             else:
-                return _name_to_instance_class(self._name)(parent=self, sid=key)
+                length = sys.maxint
 
-        return IndexError()
+        start, stop, step = key.indices(length)
+        count = len(xrange(start, stop, step))
 
-    def __len__(self):
-        self.fetch()
+        window_start = base_start + start * base_step
+        window_step  = base_step * step
 
-        return self._page_end + 1
+        return (window_start, window_start + count * window_step, window_step)
 
-    def __iter__(self):
-        return self
+    def _count(self):
+        """Total number of rows in the (filtered) list, without fetching a full page"""
+        if self._populated:
+            return self.total
 
-    def next(self):
-        current_index = (self.start or 0) + (self.current or 0)
+        return self._get_page(0, 1)["total"]
 
-        if current_index >= self.end:
-            raise StopIteration()
+    def _get_page(self, page, page_size):
+        """Fetches a single page of this list with the current filters applied"""
+        params = {
+            "Page"      : page,
+            "PageSize"  : page_size,
+        }
 
-        try:
-            item = self[current_index]
-        except IndexError:
-            raise StopIteration()
+        params.update(self._filters)
+
+        resource_data = self._client._get(self._url + ".json", params)
+
+        if self._client.mirror is not None:
+            self._client.mirror.store(self._short_name, self._allowed_attributes, resource_data[self._list_key])
+
+        return resource_data
+
+    def _populate_window(self, resource_list):
+        self._resource_data = {self._list_key: resource_list}
+        self.total          = len(resource_list)
+        self._page_start    = 0
+        self._page_end      = len(resource_list) - 1
+        self._populated     = True
 
-        self.current += self.step
+    def _fetch_window(self):
+        rows = xrange(*self._window)
+
+        if not rows:
+            self._populate_window([])
+            return
+
+        first_row, last_row = min(rows[0], rows[-1]), max(rows[0], rows[-1])
+
+        fetched = {}
+        for page, page_size in _page_windows(first_row, last_row + 1, abs(self._window[2])):
+            resource_list = self._get_page(page, page_size)[self._list_key]
+
+            for i, item in enumerate(resource_list):
+                fetched[page * page_size + i] = item
+
+            # Ran off the end of the list
+            if len(resource_list) < page_size:
+                break
+
+        self._populate_window([fetched[row] for row in rows if row in fetched])
+
+    def __len__(self):
+        self._fetch()
 
-        return item
+        # Items on the fetched page; _page_end is the row index of the last one in the whole list
+        return len(self._resource_data[self._list_key])
+
+    def __iter__(self):
+        # Each iterator keeps its own position, so the same list can be iterated from several threads
+        index = 0
+
+        while True:
+            try:
+                yield self[index]
+            except IndexError:
+                return
+
+            index += 1
 
     def fetch(self, resource_data=None):
         """Populates this class with remote data"""
-        if not self._populated:
-            params = {
-                "Page"      : self.page,
-                "PageSize"  : self.page_size,
-            }
+        self._fetch(resource_data)
 
-            params.update(self._filters)
+    def _fetch(self, resource_data=None):
+        if self._populated:
+            return
 
-            if not resource_data:
-                self._resource_data = self._client._get(self._url + ".json", params)
-            else:
-                self._resource_data = resource_data
+        # Only one thread fetches the page, the others wait for it
+        with self._lock:
+            if not self._populated:
+                self._fetch_page(resource_data)
 
-            self.total = self._resource_data["total"]
-            self._page_start = self._resource_data["start"]
-            self._page_end = self._resource_data["end"]
+    def _fetch_page(self, resource_data=None):
+        if not resource_data and self._window:
+            self._fetch_window()
+            return
 
-            self._populated = True
+        if not resource_data:
+            self._resource_data = self._get_page(self.page, self.page_size)
+        else:
+            self._resource_data = resource_data
+
+        self.total = self._resource_data["total"]
+        self._page_start = self._resource_data["start"]
+        self._page_end = self._resource_data["end"]
+
+        self._populated = True
 
     def copy(self):
 
-        new_copy = _name_to_list_class(self._name)(parent=self._parent)
+        new_copy = _name_to_list_class(self._name, self._class_prefix)(parent=self._parent)
 
+        new_copy._client  = self._client
         new_copy._filters = self._filters.copy()
+        new_copy._window  = self._window
 
         return new_copy
 
     def new(self, **kwargs):
-        resource_instance = _name_to_instance_class(self._name)(parent=self, **kwargs)
+        resource_instance = _name_to_instance_class(self._name, self._class_prefix)(parent=self, **kwargs)
 
         return resource_instance
 
@@ -215,6 +383,74 @@ class ListResource(Resource):
 
         return resource_instance
 
+    def create_many(self, items, concurrency=8, ordered=False):
+        """Creates one resource per dict of create params in `items`
+
+        Creates run on `concurrency` worker threads and `items` is consumed lazily.
+        Yields ``(index, resource_instance, error)`` tuples as creates finish, or in
+        input order if `ordered` is set. A failed create yields its exception (a
+        RequestError, a connection error or timeout from `requests`, an
+        AttributeError for an unknown param...) instead of aborting the batch. Running totals and throughput are kept in
+        `create_stats`.
+        """
+        executor = Executor(concurrency)
+        finished = Queue.Queue()
+        buffered = {}
+        pending  = 0
+        started  = time.time()
+        items    = enumerate(items)
+
+        self.create_stats = stats = {"created": 0, "failed": 0, "seconds": 0.0, "per_second": 0.0}
+
+        def create(index, kwargs):
+            # Connection errors, timeouts and bad create params fail just this item
+            try:
+                resource_instance = self.new(**kwargs)
+                InstanceResource.save(resource_instance)
+            except Exception, e:
+                return index, None, e
+
+            return index, resource_instance, None
+
+        next_index = 0
+        try:
+            while True:
+                while items and pending + len(buffered) < concurrency:
+                    try:
+                        index, kwargs = next(items)
+                    except StopIteration:
+                        items = None
+                        break
+
+                    executor.submit(create, index, kwargs).add_done_callback(finished.put)
+                    pending += 1
+
+                if not pending and not buffered:
+                    return
+
+                if pending:
+                    result = finished.get().result()
+                    pending -= 1
+                    buffered[result[0]] = result
+
+                if ordered:
+                    ready = []
+                    while next_index in buffered:
+                        ready.append(buffered.pop(next_index))
+                        next_index += 1
+                else:
+                    ready = buffered.values()
+                    buffered.clear()
+
+                for index, resource_instance, error in ready:
+                    stats["failed" if error else "created"] += 1
+                    stats["seconds"] = time.time() - started
+                    stats["per_second"] = (stats["created"] + stats["failed"]) / (stats["seconds"] or 1e-9)
+
+                    yield index, resource_instance, error
+        finally:
+            executor.shutdown()
+
     def filter(self, **kwargs):
         copy = self.copy()
 
@@ -231,8 +467,272 @@ class ListResource(Resource):
 
         return self
 
+    def iter_all(self, page_size=None, prefetch=1, records=False):
+        """Iterates over every item in the list, walking all pages
+
+        The next `prefetch` pages are fetched on a background thread while the
+        current one is consumed, so only a bounded number of pages is held in memory.
+        With `records` set, items are read-only `Record`s instead of instance resources.
+        """
+        hydrate = self._hydrator(records)
+
+        for resource_data in self._iter_pages(page_size, prefetch):
+            for item in resource_data[self._list_key]:
+                yield hydrate(item)
+
+    stream = iter_all
+
+    def export(self, fileobj, format="ndjson", fields=None, compress=False, page_size=None, start_page=0,
+            checkpoint=None):
+        """Writes every item in the (filtered) list to `fileobj` as "ndjson" or "csv"
+
+        Rows are written straight from the decoded pages, one page at a time, so
+        memory use doesn't grow with the size of the list. `fields` picks and
+        orders the columns; CSV defaults to all of the resource's attributes.
+        With `compress` set the output is gzipped.
+
+        To resume after a crash, keep the page number passed to `checkpoint`
+        after each page is written (`fileobj` has been flushed by then), truncate
+        the output to its size at that point and export again from `start_page`.
+        Returns the number of rows written.
+        """
+        if format == "csv" and fields is None:
+            fields = self._allowed_attributes
+
+        pages = self._iter_pages(page_size, start_page=start_page)
+
+        try:
+            return export_pages(pages, self._list_key, fileobj, format, fields, compress, start_page, checkpoint)
+        finally:
+            pages.close()
+
+    def to_columns(self, fields, types=None, page_size=None):
+        """Reads `fields` of every item in the (filtered) list into typed columns
+
+        Returns a NumPy structured array if NumPy is installed, otherwise an
+        ordered dict of `array.array`s (lists for strings). Numbers and dates are
+        converted a page and a column at a time, with no objects built per row.
+        `types` maps a field to "int", "float", "timestamp" or "str" for fields
+        `telapi.rest.columns.COLUMN_TYPES` doesn't know about.
+        """
+        pages = self._iter_pages(page_size)
+
+        try:
+            return collect_columns(pages, self._list_key, fields, types)
+        finally:
+            pages.close()
+
+    def sync(self, state_path, lookback=0, page_size=None, records=False):
+        """Yields the items created (or, within `lookback` seconds, updated) since the last sync
+
+        The newest `date_created` seen is kept in the JSON file at `state_path`,
+        and each sync only pages back until it reaches it, so a poll costs as
+        much as the new items rather than the whole history. The first sync
+        reads the full list. Calls that were still in progress at the last sync
+        can be picked up again by setting `lookback` to the longest call.
+
+        The state is only saved once the sync has been iterated to the end, so a
+        sync stopped early (or that crashes) is repeated in full the next time.
+        """
+        if "date_created" not in self._allowed_attributes:
+            raise AttributeError("%s has no date_created to sync on" % self.__class__.__name__)
+
+        hydrate = self._hydrator(records)
+
+        # Pages are fetched one at a time so nothing past the watermark is requested
+        for item in iter_changes(self._walk_pages(page_size), self._list_key, SyncState(state_path), lookback):
+            yield hydrate(item)
+
+    def query(self, where=None, params=(), order_by="date_created DESC", limit=None, **equals):
+        """Searches the client's mirror for items of this list, without calling the API
+
+        Keyword arguments are attributes the items must equal (`from_number`
+        and `to_number` stand in for "from" and "to", dates may be given as
+        in the API). `where` is a raw SQL condition with `params`, e.g.
+        ``where='date_created >= ?', params=(time.time() - 7 * 86400,)``.
+        Items are limited to the ones under this list's parent, e.g. the
+        calls of one account.
+        """
+        mirror = self._client.mirror
+        if mirror is None:
+            raise exceptions.RestError("query() needs a Client created with a mirror")
+
+        for alias, name in _ATTRIBUTE_ALIASES.items():
+            if alias in equals:
+                equals[name] = equals.pop(alias)
+
+        # e.g. account_sid for the calls of an account
+        if isinstance(self._parent, InstanceResource) and self._parent._short_url:
+            parent_key = self._parent._short_name[:-1] + "_sid"
+            if parent_key in self._allowed_attributes:
+                equals.setdefault(parent_key, self._parent.sid)
+
+        if order_by and "date_created" not in self._allowed_attributes:
+            order_by = None
+
+        instance_class = _name_to_instance_class(self._name, self._class_prefix)
+        return [instance_class(parent=self, fetched_data=item) for item in
+            mirror.query(self._short_name, self._allowed_attributes, where, params, order_by, limit, **equals)]
+
+    def stream_page(self, page=None, page_size=None, records=False, chunk_size=16384):
+        """Fetches one page, decoding its items while the response body is still arriving
+
+        Returns a `PageStream` to iterate over. Only the item being decoded and
+        the unread tail of the body are held in memory, and the first item is
+        available before the page has finished downloading. The page's `total`,
+        `start` and `end` are on the stream once iteration reaches them. Streamed
+        pages bypass the client's response cache. The response is closed when
+        iteration ends, or by `close()` on a stream that isn't read to the end.
+        """
+        params = {
+            "Page"      : self.page if page is None else page,
+            "PageSize"  : page_size or self.page_size,
+        }
+
+        params.update(self._filters)
+
+        response = self._client._get_stream(self._url + ".json", params)
+
+        # Decoders with only decode() can't decode a body in pieces, so those pages use the default one
+        decoder = self._client.decoder
+        if not hasattr(decoder, "raw_decode"):
+            decoder = JSONDecoder()
+
+        return PageStream(response, self._list_key, decoder.raw_decode, self._hydrator(records), chunk_size)
+
+    def fetch_all(self, concurrency=4, page_size=None, records=False):
+        """Downloads every item in the list and returns them in API order
+
+        Once the first page reveals the total, the remaining pages are fetched by
+        `concurrency` worker threads sharing the client's session. The first failed
+        page stops the download and its error is raised. Request latencies (in
+        seconds) for each page are kept in `page_latencies`. With `records` set,
+        items are read-only `Record`s instead of instance resources.
+        """
+        page_size = page_size or self.page_size
+        latencies = {}
+        pages     = {}
+        errors    = []
+
+        def fetch_page(page):
+            started = time.time()
+            resource_data = self._get_page(page, page_size)
+            latencies[page] = time.time() - started
+            pages[page] = resource_data[self._list_key]
+
+            return resource_data
+
+        total = fetch_page(0)["total"]
+
+        remaining = Queue.Queue()
+        for page in xrange(1, (total + page_size - 1) // page_size):
+            remaining.put(page)
+
+        def work():
+            while not errors:
+                try:
+                    page = remaining.get_nowait()
+                except Queue.Empty:
+                    return
+
+                try:
+                    fetch_page(page)
+                except Exception:
+                    errors.append(sys.exc_info())
+
+        workers = [threading.Thread(target=work) for i in xrange(min(concurrency, remaining.qsize()))]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+
+        self.page_latencies = [latencies[page] for page in sorted(latencies)]
+
+        hydrate = self._hydrator(records)
+        return [hydrate(item) for page in sorted(pages) for item in pages[page]]
+
+    def _hydrator(self, records=False):
+        """Returns a function that turns an item of a page into a resource object"""
+        if records:
+            record_class = _name_to_record_class(self._name)
+            return lambda item: record_class(self, item)
+
+        instance_class = _name_to_instance_class(self._name, self._class_prefix)
+        return lambda item: instance_class(parent=self, fetched_data=item)
+
+    def _is_last_page(self, resource_data, page_size):
+        return len(resource_data[self._list_key]) < page_size or resource_data["end"] + 1 >= resource_data["total"]
+
+    def _walk_pages(self, page_size=None):
+        """Yields each page of the list in order, fetching the next only once it is asked for"""
+        page_size = page_size or self.page_size
+
+        for page in itertools.count():
+            resource_data = self._get_page(page, page_size)
+            yield resource_data
+
+            if self._is_last_page(resource_data, page_size):
+                return
+
+    def _iter_pages(self, page_size=None, prefetch=1, start_page=0):
+        """Yields each page of the list in order, prefetching on a background thread"""
+        page_size = page_size or self.page_size
+        pages     = Queue.Queue(maxsize=max(prefetch, 1))
+        stopped   = threading.Event()
+
+        def put(item):
+            # Give up if the consumer went away while the queue was full
+            while not stopped.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except Queue.Full:
+                    pass
+
+            return False
+
+        def fetch_pages():
+            page = start_page
+            try:
+                while not stopped.is_set():
+                    resource_data = self._get_page(page, page_size)
+                    if not put((resource_data, None)):
+                        return
+
+                    if self._is_last_page(resource_data, page_size):
+                        break
+
+                    page += 1
+            except Exception:
+                put((None, sys.exc_info()))
+                return
+
+            put((None, None))
+
+        worker = threading.Thread(target=fetch_pages)
+        worker.daemon = True
+        worker.start()
+
+        try:
+            while True:
+                resource_data, exc_info = pages.get()
+
+                if exc_info:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+
+                if resource_data is None:
+                    return
+
+                yield resource_data
+        finally:
+            stopped.set()
+
     def __repr__(self):
-        self.fetch()
+        self._fetch()
         return str(self._resource_data)
 
 
@@ -242,19 +742,42 @@ class InstanceResourceMetaclass(type):
     def __new__(meta, classname, bases, classDict):
         return type.__new__(meta, classname, bases, classDict)
 
+# From is a reserved keyword so from_number and to_number stand in for "from" and "to"
+_ATTRIBUTE_ALIASES = {
+    "from_number"   : "from",
+    "to_number"     : "to",
+}
+
+def _alias_property(name):
+    """Read access to `name` through its alias, without a trip through __getattr__"""
+    def get(self):
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            return self.__getattr__(name)
+
+    return property(get)
+
 class InstanceResource(Resource):
     __metaclass__ = InstanceResourceMetaclass
 
+    # Precomputed from the schema for each generated class
+    _attribute_names     = ()
+    _attribute_set       = frozenset()
+    _settable_attributes = frozenset()
+    _subresources        = {}
+    _subresource_classes = {}
+
     def __init__(self, parent, sid=None, fetched_data=None, **kwargs):
         super(InstanceResource, self).__init__(parent=parent)
 
         for key, value in kwargs.items():
             setattr(self, key, value)
 
-        if 'sid' in self._allowed_attributes:
+        if 'sid' in self._attribute_set:
             self.sid = str(sid).strip() if sid else sid
             self._short_url = self.sid
-        elif 'country_code' in self._allowed_attributes:
+        elif 'country_code' in self._attribute_set:
             # regard country code as sid
             self._short_url = sid 
         else:
@@ -265,19 +788,25 @@ class InstanceResource(Resource):
 
         # This will be set if a list of objects is fetched, rather than one instance
         if fetched_data:
-            self.fetch(resource_data=fetched_data)
+            self._fetch(resource_data=fetched_data)
 
 
     def fetch(self, resource_data=None):
         """Populates this class with remote data"""
+        self._fetch(resource_data)
+
+    def _fetch(self, resource_data=None):
         try:
             if not resource_data:
                 resource_data = self._client._get(self._url + ".json")
 
-            for name in self._allowed_attributes:
-                setattr(self, name, resource_data.get(name, None))
+                if self._client.mirror is not None:
+                    self._client.mirror.store(self._short_name, self._allowed_attributes, [resource_data])
 
-            if 'sid' in self._allowed_attributes:
+            # Schema attributes are always settable, so skip the checks in __setattr__
+            self.__dict__.update((name, resource_data.get(name)) for name in self._attribute_names)
+
+            if 'sid' in self._attribute_set:
                 self._short_url = self.sid
             else:
                 self._short_url = ""
@@ -293,34 +822,30 @@ class InstanceResource(Resource):
         if name.startswith('_'):
             return self.__getattribute__(name)
 
-        # From is a reserved keyword so we need to map it to from_number
-        if name == "from_number":
-            name = "from"
-        elif name == "to_number":
-            name = "to"
+        name = _ATTRIBUTE_ALIASES.get(name, name)
+
+        list_class = self._subresource_classes.get(name)
 
-        subresource = SCHEMA["rest_api"]["components"].get(name, None)
+        if list_class is None and name in self._subresources:
+            list_class = _name_to_list_class(self._subresources[name], self._class_prefix)
+            self._subresource_classes[name] = list_class
 
-        if subresource:
-            if self._short_name in subresource["parent_resources"]:
-                resource_instance = _name_to_list_class(subresource["name"])(parent=self)
-                return resource_instance
+        # A new list every time, so each access sees the current items
+        if list_class is not None:
+            return list_class(parent=self)
 
         if not self._populated:
-            self.fetch()
+            self._fetch()
 
         return self.__getattribute__(name)
 
     def __setattr__(self, name, value):
-        if name == "from_number":
-            name = "from"
-        elif name == "to_number":
-            name = "to"
+        name = _ATTRIBUTE_ALIASES.get(name, name)
 
-        if name.startswith('_') or name in self._allowed_attributes or name in self._create_params or name in self._update_params:
+        if name in self._settable_attributes or name.startswith('_'):
             return object.__setattr__(self, name, value)
         
-        raise AttributeError("'%s' not a valid attribute of %s (allowed attributes: %s)" % (name, self, self._allowed_attributes))
+        raise AttributeError("'%s' not a valid attribute of %s (allowed attributes: %s)" % (name, self.__class__.__name__, self._allowed_attributes))
 
         
 
@@ -352,13 +877,19 @@ class InstanceResource(Resource):
         # print 'save data:', data
 
         resource_data = self._client._post(self._url + ".json", data)
+
+        # Created and updated resources are mirrored like fetched ones
+        if self._client.mirror is not None:
+            self._client.mirror.store(self._short_name, self._allowed_attributes, [resource_data])
+
         self._full_url = None
-        self.fetch(resource_data=resource_data)
+        self._fetch(resource_data=resource_data)
 
         return self
 
     def delete(self):
         self._client._delete(self._url + ".json")
+        self._client.identity_map.invalidate(self._url)
 
         return None
 
@@ -366,12 +897,166 @@ class InstanceResource(Resource):
         return self._resource_data.keys()
 
     def __repr__(self):
-        self.fetch()
+        self._fetch()
         return str(self._resource_data)
 
 
 
 
+class Record(object):
+    """Read-only item of a list page
+
+    Records hold just the schema attributes in slots (and, outside of those, the
+    list they came from), so they take a fraction of the memory and construction
+    time of an InstanceResource. Iterating a record gives its values in `_fields`
+    order. Call `instance()` to upgrade one to a full resource.
+    """
+
+    __slots__ = ("_parent",)
+    _fields   = ()
+
+    # (attribute, setter of its slot) pairs, filled in for each generated class
+    _setters  = ()
+
+    def __init__(self, parent, resource_data):
+        get = resource_data.get
+
+        for name, set_value in self._setters:
+            set_value(self, get(name))
+
+        _set_record_parent(self, parent)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is read-only" % self.__class__.__name__)
+
+    __delattr__ = __setattr__
+
+    def instance(self):
+        parent = self._parent
+        return _name_to_instance_class(self._name, parent._class_prefix)(parent=parent, fetched_data=self._asdict())
+
+    def _asdict(self):
+        return dict(zip(self._fields, self))
+
+    def keys(self):
+        return list(self._fields)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+
+        return getattr(self, self.__slots__[index])
+
+    def __eq__(self, other):
+        return self.__class__ is other.__class__ and tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return str(self._asdict())
+
+_set_record_parent = Record._parent.__set__
+
+
+
+class AsyncListResource(ListResource):
+    """List resource whose network calls run on the client's executor and return a `Future`
+
+    `fetch`, `fetch_page`, `create` and `fetch_all` return Futures, and
+    `iter_pages` walks the list a page at a time through them. Indexing,
+    iterating and len() on a list that hasn't been fetched yet, and the
+    generators (`iter_all`, `sync`, ...) and `export`/`to_columns`, still make
+    their requests on the calling thread; once the Future from `fetch()` or
+    `fetch_page()` is done, the list can be indexed and iterated without I/O.
+    """
+
+    _class_prefix = "Async"
+
+    def fetch(self, resource_data=None):
+        return self._client._submit(self._fetch_and_return, resource_data)
+
+    def _fetch_and_return(self, resource_data):
+        self._fetch(resource_data)
+
+        return self
+
+    def fetch_page(self, page, page_size=None):
+        """Returns a Future for a copy of this (filtered) list holding page `page`"""
+        page_list           = self.copy()
+        page_list._window   = None
+        page_list.page      = page
+        page_list.page_size = page_size or self.page_size
+
+        return page_list.fetch()
+
+    def iter_pages(self, page_size=None, prefetch=4):
+        """Yields a Future for each page of the list, in order, as returned by `fetch_page`
+
+        Up to `prefetch` pages are requested ahead of the one last yielded.
+        Asking for the second page waits for the first one, which holds the
+        number of pages, so a caller should wait on each Future before asking
+        for the next if it doesn't want to block there.
+        """
+        page_size = page_size or self.page_size
+
+        first_page = self.fetch_page(0, page_size)
+        yield first_page
+
+        num_pages = (first_page.result().total + page_size - 1) // page_size
+        pending   = collections.deque()
+        next_page = 1
+
+        while next_page < num_pages or pending:
+            while next_page < num_pages and len(pending) < max(prefetch, 1):
+                pending.append(self.fetch_page(next_page, page_size))
+                next_page += 1
+
+            yield pending.popleft()
+
+    def create(self, **kwargs):
+        return self.new(**kwargs).save()
+
+    def fetch_all(self, concurrency=4, page_size=None, records=False):
+        return self._client._submit(ListResource.fetch_all, self, concurrency, page_size, records)
+
+
+
+class AsyncInstanceResource(InstanceResource):
+    """Instance resource whose `fetch`, `save` and `delete` return a `Future`
+
+    Reading an attribute of an instance that hasn't been loaded yet fetches it
+    on the calling thread, so wait on `fetch()` first.
+    """
+
+    _class_prefix = "Async"
+
+    def fetch(self, resource_data=None):
+        return self._client._submit(self._fetch_and_return, resource_data)
+
+    def _fetch_and_return(self, resource_data):
+        self._fetch(resource_data)
+
+        return self
+
+    def save(self):
+        return self._client._submit(InstanceResource.save, self)
+
+    def delete(self):
+        return self._client._submit(InstanceResource.delete, self)
+
+
+
+
 class ClientMetaclass(type):
     def __new__(meta, classname, bases, classDict):
         return type.__new__(meta, classname, bases, classDict)
@@ -381,16 +1066,77 @@ class Client(object):
 
     Instead of passing account_sid and auth_token to this class, you can set
     environment variables `TELAPI_ACCOUNT_SID` and `TELAPI_AUTH_TOKEN`.
+
+    Connections are kept alive and pooled; `pool_connections` is the number of
+    hosts to keep pools for and `pool_maxsize` the connections kept per host.
+    With `pool_block` set, requests wait for a free connection instead of
+    opening throwaway ones once the pool is exhausted.
+
+    Pass a `retry.RetryPolicy` as `retry` to resend requests that hit connection
+    errors, 429s or 5xx responses. `session` replaces the underlying
+    `requests.Session`, e.g. with a fake transport in tests.
+
+    A `ratelimit.RateLimiter` passed as `rate_limiter` paces every request
+    (including retries) to stay under the account's limits.
+
+    A `cache.ResponseCache` passed as `cache` serves repeated GETs (including
+    lazy attribute loads on instance resources) from memory.
+
+    Response bodies are decoded by `decoder`, a `decoder.JSONDecoder` by
+    default; pass one configured with hooks or a backend, or any object with
+    a `decode(bytes)` method. `ListResource.stream_page()` also needs a
+    `raw_decode(text, index)` method, and uses a default `JSONDecoder` if the
+    decoder doesn't have one.
+
+    Resources are shared through `identity_map`: every lookup of the same
+    account, call etc. by SID returns the same object, so it is only fetched
+    once. Use `identity_map.invalidate(url)` to get fresh objects. Lists are
+    not shared: `client.accounts`, `account.calls` etc. are new on every access.
+
+    Identical GETs made at the same time (e.g. many threads fetching one
+    call) are coalesced into a single request whose decoded response every
+    caller shares, so it must not be modified. `single_flight.coalesced`
+    counts the requests saved. Pass `coalesce=False` to turn this off.
+
+    A `mirror.Mirror` passed as `mirror` keeps a local SQLite copy of every
+    item fetched, which `ListResource.query()` searches offline.
+
+    Thread safety: a Client may be shared by any number of threads. List
+    resources may be fetched, sliced and iterated concurrently (every iteration
+    gets its own cursor). An instance resource that is being modified with
+    setattr/save() must not be shared between threads without your own locking.
     """
 
     __metaclass__ = ClientMetaclass
-    
-    def __init__(self, account_sid=None, auth_token=None, base_url="https://api.telapi.com/v1/", *args, **kwargs):
+
+    # Prefix of the generated resource classes this client hands out
+    _class_prefix = ""
+
+    def __init__(self, account_sid=None, auth_token=None, base_url="https://api.telapi.com/v1/", pool_connections=10, 
+            pool_maxsize=10, pool_block=False, keep_alive=True, retry=None, session=None, 
+            rate_limiter=None, cache=None, decoder=None, mirror=None, coalesce=True, *args, **kwargs):
         object.__init__(self)
-        self.account_sid = account_sid or os.environ.get("TELAPI_ACCOUNT_SID")
-        self.auth_token  = auth_token or os.environ.get("TELAPI_AUTH_TOKEN")
-        self.base_url    = base_url
-        self.session     = requests.session()
+        self.account_sid   = account_sid or os.environ.get("TELAPI_ACCOUNT_SID")
+        self.auth_token    = auth_token or os.environ.get("TELAPI_AUTH_TOKEN")
+        self.base_url      = base_url
+        self.retry         = retry
+        self.rate_limiter  = rate_limiter
+        self.cache         = cache
+        self.decoder       = decoder or JSONDecoder()
+        self.mirror        = mirror
+        self.identity_map  = IdentityMap()
+        self.single_flight = SingleFlight() if coalesce else None
+        self.session       = session
+
+        if self.session is None:
+            self.session = requests.session()
+
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
 
         if not self.account_sid or not self.account_sid.startswith("AC") or len(self.account_sid) != 34:
             raise exceptions.AccountSidError()
@@ -398,7 +1144,7 @@ class Client(object):
         if not self.auth_token or len(self.auth_token) != 32:
             raise exceptions.AuthTokenError()
 
-    def _send_request(self, resource_uri, method, params=None):
+    def _send_request(self, resource_uri, method, params=None, stream=False):
         # print
         # print "_send_request", self.base_url, resource_uri, method, params
         # print
@@ -412,26 +1158,69 @@ class Client(object):
             }
         }
 
-        if method == "POST":
-            response = self.session.post(url, data=params, verify=False, **extra_params)
-        elif method == "DELETE":
-            response = self.session.delete(url, data=params, verify=False, **extra_params)
-        else:
-            response = self.session.get(url, params=params, verify=False, **extra_params)
+        if stream:
+            extra_params["stream"] = True
+
+        cached = None
+        if self.cache is not None and method == "GET" and not stream:
+            cached = self.cache.lookup(resource_uri, params)
+
+            if cached is not None:
+                if self.cache.is_fresh(cached):
+                    return cached.data
+
+                extra_params["headers"].update(cached.validators())
+
+        retries = 0
+
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(method, resource_uri)
+
+            try:
+                if method == "POST":
+                    response = self.session.post(url, data=params, verify=False, **extra_params)
+                elif method == "DELETE":
+                    response = self.session.delete(url, data=params, verify=False, **extra_params)
+                else:
+                    response = self.session.get(url, params=params, verify=False, **extra_params)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout), e:
+                if not self.retry or not self.retry.should_retry(method, retries):
+                    e.retries = retries
+                    raise
+
+                self.retry.sleep(self.retry.backoff(retries))
+                retries += 1
+                continue
+
+            if response.status_code >= 400 and self.retry and self.retry.should_retry(method, retries, response.status_code):
+                self.retry.sleep(self.retry.backoff(retries, response.headers.get("Retry-After")))
+                retries += 1
+                continue
+
+            break
+
+        if cached is not None and response.status_code == 304:
+            self.cache.revalidated(cached)
+            return cached.data
 
         if response.status_code >= 400:
                 try:
-                    error = json.loads(response.content)
-                    raise exceptions.RequestError("Error code %s. %s. More info at %s" % (error["code"], error["message"], error["more_info"]), error_code=error["code"], http_code=response.status_code)
+                    error = self.decoder.decode(response.content)
+                    raise exceptions.RequestError("Error code %s. %s. More info at %s" % (error["code"], error["message"], error["more_info"]), error_code=error["code"], http_code=response.status_code, retries=retries)
                 except ValueError:
-                    raise exceptions.RequestError("Error requesting %s to '%s'. Status code: %s" % (method, url, response.status_code), http_code=response.status_code)
+                    raise exceptions.RequestError("Error requesting %s to '%s'. Status code: %s" % (method, url, response.status_code), http_code=response.status_code, retries=retries)
+
+        # The caller reads the body itself
+        if stream:
+            return response
 
         # print
         # print response.content
         # print
 
         try:
-            return json.loads(response.content)
+            resource_data = self.decoder.decode(response.content)
         except ValueError, e:
             print 'Bad JSON returned! response.text:'
             print response.content
@@ -443,8 +1232,24 @@ class Client(object):
             
             raise
 
+        if self.cache is not None:
+            if method == "GET":
+                self.cache.store(resource_uri, params, resource_data, response.headers)
+            else:
+                self.cache.invalidate(resource_uri)
+
+        return resource_data
+
     def _get(self, resource_uri, params=None):
-        return self._send_request(resource_uri, "GET", params)
+        if self.single_flight is None:
+            return self._send_request(resource_uri, "GET", params)
+
+        key = (resource_uri, tuple(sorted((params or {}).items())))
+        return self.single_flight.do(key, lambda: self._send_request(resource_uri, "GET", params))
+
+    def _get_stream(self, resource_uri, params=None):
+        """GETs `resource_uri` without reading the body, returning the response"""
+        return self._send_request(resource_uri, "GET", params, stream=True)
 
     def _post(self, resource_uri, params=None):
         return self._send_request(resource_uri, "POST", params)
@@ -460,21 +1265,66 @@ class Client(object):
         if not resource or resource["parent_resources"]:
             raise AttributeError()
 
+        # A new list every time, like subresource lists; only instances are shared
+        return self._root_list(resource["name"])
+
+    def _root_list(self, name):
         # Resolve a name like "accounts" to a list resource
-        resource_instance = _name_to_list_class(resource["name"])(parent=None)
+        resource_instance = _name_to_list_class(name, self._class_prefix)(parent=None)
         resource_instance._client = self
 
         return resource_instance
 
+
+
+class AsyncClient(Client):
+    """TelAPI REST Client that doesn't block on the network
+
+    Resources handed out by this client mirror the ones from `Client`, but their
+    `fetch`, `save`, `delete`, `create` and `fetch_all` methods run on a pool of
+    `concurrency` worker threads and return a `Future`. Lists are paged through
+    with `fetch_page` and `iter_pages`. Use `gather` to wait on many Futures at
+    once.
+
+    Lazy loads still block: reading an attribute of an instance, or indexing,
+    iterating or taking len() of a list, that hasn't been fetched yet makes the
+    request on the calling thread, as do the list generators (`iter_all`,
+    `sync`, ...) and `export`/`to_columns`.
+    """
+
+    _class_prefix = "Async"
+
+    def __init__(self, account_sid=None, auth_token=None, base_url="https://api.telapi.com/v1/", concurrency=16, *args, **kwargs):
+        # Let every worker hold its own connection
+        kwargs.setdefault("pool_maxsize", concurrency)
+
+        super(AsyncClient, self).__init__(account_sid, auth_token, base_url, *args, **kwargs)
+        self._executor = Executor(concurrency)
+
+    def _submit(self, func, *args, **kwargs):
+        return self._executor.submit(func, *args, **kwargs)
+
+    def gather(self, tasks, concurrency=None, return_exceptions=False):
+        """Waits for Futures (or callables returning them) and returns their results in order
+
+        At most `concurrency` callables are started before earlier ones finish.
+        """
+        return gather(tasks, concurrency, return_exceptions)
+
         
 
 
 
-# Create Classes for all REST resources dynamically
-for element, properties in SCHEMA["rest_api"]["components"].items():
+# Classes for REST resources are created from the schema the first time they're used,
+# either internally or by being looked up on the module
+def _create_resource_classes(element, properties, prefix):
+    instance_base, list_base = {
+        ""      : (InstanceResource, ListResource),
+        "Async" : (AsyncInstanceResource, AsyncListResource),
+    }[prefix]
 
     # Create Instance Resource Class
-    class_name = _name_to_instance_class_name(properties["name"])
+    class_name = _name_to_instance_class_name(properties["name"], prefix)
     docstring = """%s REST instance resource
     -------------------------
     Attributes: %s
@@ -496,12 +1346,22 @@ for element, properties in SCHEMA["rest_api"]["components"].items():
         "_short_name"           : element,
         "_create_params"        : properties.get("create_params", {}),
         "_update_params"        : properties.get("update_params", {}),
+        "_attribute_names"      : tuple(intern(str(name)) for name in properties["attributes"]),
+        "_attribute_set"        : frozenset(properties["attributes"]),
+        "_settable_attributes"  : frozenset(properties["attributes"]) | frozenset(properties.get("create_params", {})) | 
+                                  frozenset(properties.get("update_params", {})),
+        "_subresources"         : _subresources_by_parent().get(element, {}),
+        "_subresource_classes"  : {},
     }
-    globals()[class_name] = classobj(class_name, (InstanceResource,), resource_dict)
+
+    for alias, name in _ATTRIBUTE_ALIASES.items():
+        if name in resource_dict["_settable_attributes"]:
+            resource_dict[alias] = _alias_property(str(name))
+    globals()[class_name] = classobj(class_name, (instance_base,), resource_dict)
 
 
     # Create List Resource Class
-    class_name = _name_to_list_class_name(properties["name"])
+    class_name = _name_to_list_class_name(properties["name"], prefix)
     docstring = """%s REST list resource
     -------------------------
     Parent resources: %s
@@ -522,9 +1382,86 @@ for element, properties in SCHEMA["rest_api"]["components"].items():
         "_filter_params"        : properties.get("filter_params", []),
         "_fetchable"            : properties.get("fetchable", True)
     }
-    globals()[class_name] = classobj(class_name, (ListResource,), resource_dict)
+    globals()[class_name] = classobj(class_name, (list_base,), resource_dict)
+
+
+    # Create Record Class, shared by both flavours
+    if prefix:
+        return
+
+    class_name = _name_to_record_class_name(properties["name"])
+    record_dict = {
+        "__slots__"             : tuple(str(name) for name in properties["attributes"]),
+        "__doc__"               : "%s read-only record" % element,
+        "_fields"               : tuple(properties["attributes"]),
+        "_name"                 : properties["name"],
+    }
+
+    record_class = classobj(class_name, (Record,), record_dict)
+    record_class._setters = tuple((name, getattr(record_class, str(name)).__set__) for name in record_class._fields)
+
+    # From is a reserved keyword so it's also exposed as from_number
+    for alias, name in _ATTRIBUTE_ALIASES.items():
+        if name in record_class._fields:
+            setattr(record_class, alias, property(getattr(record_class, name).__get__))
+
+    globals()[class_name] = record_class
+
+
+
+@memoized
+def _generated_class_names():
+    """Maps the name of every class generated from the schema to its ``(resource name, prefix)``"""
+    names = {}
+
+    for resource_name in _components_by_name():
+        for prefix in ("", "Async"):
+            names[_name_to_instance_class_name(resource_name, prefix)] = (resource_name, prefix)
+            names[_name_to_list_class_name(resource_name, prefix)] = (resource_name, prefix)
+
+        names[_name_to_record_class_name(resource_name)] = (resource_name, "")
 
+    return names
 
+class _LazyModule(types.ModuleType):
+    """Stands in for this module in sys.modules so the generated classes can be imported by name
 
+    Attributes are read from and written to the real module. A name it
+    doesn't have yet that belongs to a generated class creates that class.
+    """
+
+    def __init__(self, module):
+        types.ModuleType.__init__(self, module.__name__, module.__doc__)
+
+        # Holding on to the real module also keeps Python from clearing its globals
+        self.__dict__["_module"] = module
+
+    def __getattr__(self, name):
+        try:
+            return getattr(self._module, name)
+        except AttributeError:
+            if name.startswith("_") or name not in _generated_class_names():
+                raise
+
+        resource_name, prefix = _generated_class_names()[name]
+        return _resource_class(name, resource_name, prefix)
+
+    def __setattr__(self, name, value):
+        setattr(self._module, name, value)
+
+    def __delattr__(self, name):
+        delattr(self._module, name)
+
+    def __dir__(self):
+        return sorted(set(dir(self._module)) | set(_generated_class_names()))
+
+    def __repr__(self):
+        return repr(self._module)
+
+    @property
+    def __all__(self):
+        # `import *` creates every class, as importing the module used to
+        return [name for name in dir(self) if not name.startswith("_")]
 
+sys.modules[__name__] = _LazyModule(sys.modules[__name__])
 
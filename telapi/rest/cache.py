@@ -0,0 +1,116 @@
+import time
+import threading
+from collections import OrderedDict
+
+from telapi.utils import resource_name
+
+
+class CacheEntry(object):
+    __slots__ = ("resource_uri", "data", "expires", "etag", "last_modified")
+
+    def __init__(self, resource_uri, data, expires, etag=None, last_modified=None):
+        self.resource_uri  = resource_uri
+        self.data          = data
+        self.expires       = expires
+        self.etag          = etag
+        self.last_modified = last_modified
+
+    def validators(self):
+        """Headers that make a GET conditional on this entry being out of date"""
+        headers = {}
+
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class ResponseCache(object):
+    """LRU cache of decoded GET responses for a Client
+
+    Entries live for `ttl` seconds, or for `ttls[name]` where `name` is a
+    resource name from the schema (e.g. {"recordings": 86400, "calls": 0}); a TTL
+    of 0 disables caching. At most `max_entries` responses are kept, evicting the
+    least recently used. Stale entries that came with an ETag or Last-Modified
+    header are revalidated with a conditional GET instead of refetched. Any POST
+    or DELETE drops the cached responses for the resource it touched.
+
+    Cached data is shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries=1000, ttl=60, ttls=None, clock=time.time):
+        self.max_entries   = max_entries
+        self.ttl           = ttl
+        self.ttls          = ttls or {}
+        self.clock         = clock
+        self.hits          = 0
+        self.misses        = 0
+        self.revalidations = 0
+        self._entries      = OrderedDict()
+        self._lock         = threading.Lock()
+
+    def _key(self, resource_uri, params):
+        return resource_uri, tuple(sorted((params or {}).items()))
+
+    def lookup(self, resource_uri, params=None):
+        """Returns the entry for a GET (fresh or stale), or None"""
+        key = self._key(resource_uri, params)
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries[key] = entry
+
+            if entry.expires > self.clock():
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            return entry
+
+    def is_fresh(self, entry):
+        return entry.expires > self.clock()
+
+    def store(self, resource_uri, params, data, headers=None):
+        ttl = self.ttls.get(resource_name(resource_uri), self.ttl)
+        if not ttl:
+            return
+
+        headers = headers or {}
+        entry = CacheEntry(resource_uri, data, self.clock() + ttl, headers.get("ETag"), headers.get("Last-Modified"))
+
+        with self._lock:
+            self._entries.pop(self._key(resource_uri, params), None)
+            self._entries[self._key(resource_uri, params)] = entry
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def revalidated(self, entry):
+        """Marks a stale entry as fresh again after a 304 Not Modified"""
+        with self._lock:
+            self.revalidations += 1
+            entry.expires = self.clock() + self.ttls.get(resource_name(entry.resource_uri), self.ttl)
+
+    def invalidate(self, resource_uri):
+        """Drops everything under the resource `resource_uri` points at, and its parent list"""
+        path = resource_uri.rsplit(".json", 1)[0]
+        parent_list = path.rsplit("/", 1)[0] + ".json"
+
+        with self._lock:
+            for key in self._entries.keys():
+                if key[0] == parent_list or key[0].startswith(path + "/") or key[0].startswith(path + "."):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,199 @@
+import array
+import calendar
+from collections import OrderedDict
+
+
+# Column types of the numeric and timestamp attributes in the schema, the rest are strings
+COLUMN_TYPES = {
+    "duration"          : "int",
+    "error_code"        : "int",
+    "length"            : "int",
+    "member_count"      : "int",
+    "quantity"          : "int",
+    "price"             : "float",
+    "account_balance"   : "float",
+    "averagecost"       : "float",
+    "totalcost"         : "float",
+    "monthly_cost"      : "float",
+    "setup_cost"        : "float",
+    "rate"              : "float",
+    "latitude"          : "float",
+    "longitude"         : "float",
+    "date_created"      : "timestamp",
+    "date_updated"      : "timestamp",
+    "date_sent"         : "timestamp",
+    "message_date"      : "timestamp",
+    "start_time"        : "timestamp",
+    "end_time"          : "timestamp",
+}
+
+_MONTHS = dict((name, number) for number, name in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1))
+
+_NAT = -2 ** 63
+
+
+def parse_timestamp(value):
+    """Seconds since the epoch for an API date like "Tue, 19 Feb 2013 21:53:21 +0000", None if empty"""
+    if not value:
+        return None
+
+    try:
+        seconds = calendar.timegm((int(value[12:16]), _MONTHS[value[8:11]], int(value[5:7]),
+            int(value[17:19]), int(value[20:22]), int(value[23:25])))
+        offset = value[26:]
+        if offset and offset != "+0000":
+            sign = -1 if offset[0] == "-" else 1
+            seconds -= sign * (int(offset[1:3]) * 3600 + int(offset[3:5]) * 60)
+
+        return seconds
+    except (KeyError, ValueError):
+        # Not in the usual layout (e.g. a single digit day), let the email package work it out
+        import email.utils
+
+        parsed = email.utils.parsedate_tz(value)
+        return email.utils.mktime_tz(parsed) if parsed else None
+
+
+def _to_int(values):
+    return [int(value) if value not in (None, "") else 0 for value in values]
+
+
+def _to_float(values):
+    nan = float("nan")
+    return [float(value) if value not in (None, "") else nan for value in values]
+
+
+def _to_str(values):
+    return [value if value is not None else u"" for value in values]
+
+
+class ArrayColumns(object):
+    """Collects columns into `array.array`s (strings into lists)
+
+    Timestamps are stored as float seconds since the epoch and missing numbers
+    as NaN, or 0 in int columns.
+    """
+
+    def __init__(self, fields):
+        self.fields  = fields
+        self.columns = OrderedDict()
+
+        for name, kind in fields:
+            if kind == "int":
+                self.columns[name] = array.array("l")
+            elif kind in ("float", "timestamp"):
+                self.columns[name] = array.array("d")
+            else:
+                self.columns[name] = []
+
+    def add_page(self, items):
+        nan = float("nan")
+
+        for name, kind in self.fields:
+            values = [item.get(name) for item in items]
+
+            if kind == "int":
+                values = _to_int(values)
+            elif kind == "float":
+                values = _to_float(values)
+            elif kind == "timestamp":
+                values = [nan if seconds is None else seconds for seconds in map(parse_timestamp, values)]
+            else:
+                values = _to_str(values)
+
+            self.columns[name].extend(values)
+
+    def result(self):
+        return self.columns
+
+
+class NumpyColumns(object):
+    """Collects columns into a NumPy structured array
+
+    The array is allocated for `total` rows up front and grown in place if the
+    list gets longer while it is read. Timestamps are `datetime64[s]` (NaT when
+    missing), missing floats are NaN and missing ints 0. Strings are objects.
+    """
+
+    DTYPES = {
+        "int"       : "i8",
+        "float"     : "f8",
+        "timestamp" : "datetime64[s]",
+        "str"       : "O",
+    }
+
+    def __init__(self, fields, total=0):
+        import numpy
+
+        self.fields = fields
+        self.dtype  = numpy.dtype([(str(name), self.DTYPES[kind]) for name, kind in fields])
+        self.rows   = numpy.zeros(total, dtype=self.dtype)
+        self.size   = 0
+
+    def add_page(self, items):
+        import numpy
+
+        end = self.size + len(items)
+
+        if end > len(self.rows):
+            self.rows.resize(max(end, 2 * len(self.rows)), refcheck=False)
+
+        for name, kind in self.fields:
+            values = [item.get(name) for item in items]
+            column = self.rows[str(name)]
+
+            if kind == "int":
+                column[self.size:end] = numpy.array(_to_int(values), dtype="i8")
+            elif kind == "float":
+                column[self.size:end] = numpy.array(_to_float(values), dtype="f8")
+            elif kind == "timestamp":
+                seconds = [_NAT if seconds is None else seconds for seconds in map(parse_timestamp, values)]
+                column[self.size:end] = numpy.array(seconds, dtype="i8").view("datetime64[s]")
+            else:
+                column[self.size:end] = _to_str(values)
+
+        self.size = end
+
+    def result(self):
+        if self.size != len(self.rows):
+            self.rows.resize(self.size, refcheck=False)
+
+        return self.rows
+
+
+def _import_numpy():
+    """NumPy if it is installed, else None
+
+    It is only imported once columns are collected, as loading it takes several
+    times longer than importing the rest of the client.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+def collect_columns(pages, list_key, fields, types=None):
+    """Reads `fields` of every item in `pages` into typed columns
+
+    `types` maps a field to "int", "float", "timestamp" or "str", overriding
+    `COLUMN_TYPES`. Uses NumPy when it is installed.
+    """
+    types = types or {}
+    fields = [(name, types.get(name, COLUMN_TYPES.get(name, "str"))) for name in fields]
+    numpy = _import_numpy()
+    columns = None
+
+    for resource_data in pages:
+        if columns is None:
+            columns = NumpyColumns(fields, resource_data.get("total", 0)) if numpy else ArrayColumns(fields)
+
+        columns.add_page(resource_data[list_key])
+
+    if columns is None:
+        columns = NumpyColumns(fields) if numpy else ArrayColumns(fields)
+
+    return columns.result()
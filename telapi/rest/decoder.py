@@ -0,0 +1,48 @@
+import json
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+
+class JSONDecoder(object):
+    """Decodes response bodies straight from the bytes the server sent
+
+    Uses simplejson when it is installed (its C decoder is the fastest on large
+    list pages), then ujson, falling back to the standard library. ujson doesn't
+    support hooks, so it is skipped when `object_hook` or `object_pairs_hook` is
+    given. A specific module can be forced with `backend` (anything with a
+    json-compatible `loads`).
+    """
+
+    def __init__(self, object_hook=None, object_pairs_hook=None, backend=None):
+        hooks = {}
+
+        if object_hook:
+            hooks["object_hook"] = object_hook
+        if object_pairs_hook:
+            hooks["object_pairs_hook"] = object_pairs_hook
+
+        if backend is None:
+            candidates = (simplejson, json) if hooks else (simplejson, ujson, json)
+            backend = [module for module in candidates if module is not None][0]
+
+        self.backend = backend
+        self._hooks  = hooks
+
+        # Incremental decoding needs raw_decode, which ujson doesn't have
+        self._raw_decoder = getattr(backend, "JSONDecoder", (simplejson or json).JSONDecoder)(**hooks)
+
+    def decode(self, content):
+        """Raises ValueError if `content` isn't valid JSON"""
+        return self.backend.loads(content, **self._hooks)
+
+    def raw_decode(self, content, index=0):
+        """Decodes the JSON value starting at `index`, returning it and the index just past it"""
+        return self._raw_decoder.raw_decode(content, index)
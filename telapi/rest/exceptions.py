@@ -1,9 +1,10 @@
 class RestError(Exception):
-    def __init__(self, message, error_code=None, http_code=None):
+    def __init__(self, message, error_code=None, http_code=None, retries=0):
         Exception.__init__(self, message)
         self.message    = message
         self.error_code = error_code
         self.http_code  = http_code
+        self.retries    = retries
 
 class AccountSidError(RestError):
     def __init__(self, message=None, error_code=None, http_code=None):
@@ -0,0 +1,147 @@
+import sys
+import threading
+import Queue
+
+
+class Future(object):
+    """The eventual result of a call running on an Executor"""
+
+    def __init__(self):
+        self._done      = threading.Event()
+        self._lock      = threading.Lock()
+        self._result    = None
+        self._exc_info  = None
+        self._callbacks = []
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """Blocks until the call finishes and returns its value, re-raising any error"""
+        if not self._done.wait(timeout):
+            raise RuntimeError("Timed out waiting for result")
+
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+
+        return self._result
+
+    def exception(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise RuntimeError("Timed out waiting for result")
+
+        return self._exc_info[1] if self._exc_info else None
+
+    def add_done_callback(self, callback):
+        """Calls `callback(future)` once the call finishes, or right away if it already has"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+
+        callback(self)
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exc_info(self, exc_info):
+        self._exc_info = exc_info
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            callback(self)
+
+
+class Executor(object):
+    """Runs calls on a fixed number of daemon worker threads, started on first use"""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._tasks      = Queue.Queue()
+        self._workers    = []
+        self._lock       = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self._tasks.put((future, func, args, kwargs))
+
+        with self._lock:
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work)
+                worker.daemon = True
+                worker.start()
+                self._workers.append(worker)
+
+        return future
+
+    def shutdown(self):
+        """Stops the workers once the calls already submitted have finished"""
+        with self._lock:
+            for worker in self._workers:
+                self._tasks.put(None)
+
+            self._workers = []
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+
+            if task is None:
+                return
+
+            future, func, args, kwargs = task
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                future.set_exc_info(sys.exc_info())
+            else:
+                future.set_result(result)
+
+
+def gather(tasks, concurrency=None, return_exceptions=False):
+    """Waits for `tasks` and returns their results in order
+
+    Each task is a Future, or a callable that returns a Future (or a plain value).
+    Callables are only started while fewer than `concurrency` tasks are
+    unfinished, so huge task generators can be consumed lazily.
+    """
+    slots   = threading.BoundedSemaphore(concurrency) if concurrency else None
+    futures = []
+
+    for task in tasks:
+        if slots:
+            slots.acquire()
+
+        if callable(task):
+            try:
+                task = task()
+            except Exception:
+                future = Future()
+                future.set_exc_info(sys.exc_info())
+                task = future
+
+        if not isinstance(task, Future):
+            future = Future()
+            future.set_result(task)
+            task = future
+
+        if slots:
+            task.add_done_callback(lambda future: slots.release())
+
+        futures.append(task)
+
+    results = []
+    for future in futures:
+        if return_exceptions and future.exception():
+            results.append(future.exception())
+        else:
+            results.append(future.result())
+
+    return results
@@ -0,0 +1,96 @@
+import json
+from collections import OrderedDict
+
+
+class NDJSONWriter(object):
+    """Writes one JSON object per line, keeping only `fields` (in that order) if given"""
+
+    def __init__(self, fileobj, fields=None):
+        self.fileobj = fileobj
+        self.fields  = fields
+
+    def write_header(self):
+        pass
+
+    def write_rows(self, items):
+        fields = self.fields
+
+        if fields:
+            items = (OrderedDict((field, item.get(field)) for field in fields) for item in items)
+
+        self.fileobj.write("".join(json.dumps(item, separators=(",", ":")) + "\n" for item in items))
+
+
+class CSVWriter(object):
+    """Writes `fields` of each item as a CSV row, UTF-8 encoded
+
+    Missing values are written as empty cells and nested values (like
+    `subresource_uris`) as JSON.
+    """
+
+    def __init__(self, fileobj, fields):
+        import csv
+
+        self.fields = fields
+        self.writer = csv.writer(fileobj)
+
+    def write_header(self):
+        self.writer.writerow(self.fields)
+
+    def write_rows(self, items):
+        fields = self.fields
+        self.writer.writerows([_csv_value(item.get(field)) for field in fields] for item in items)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+
+    return value
+
+
+FORMATS = {
+    "ndjson"    : NDJSONWriter,
+    "csv"       : CSVWriter,
+}
+
+
+def export_pages(pages, list_key, fileobj, format="ndjson", fields=None, compress=False, start_page=0, checkpoint=None):
+    """Writes the items of each page in `pages` to `fileobj`, returning how many were written
+
+    A page is written in full and `fileobj` flushed before `checkpoint(next_page)`
+    is called. With `compress` set, every page becomes its own gzip member, so
+    the output can be truncated at any checkpoint and appended to and still
+    decompress as a single stream.
+    """
+    if format not in FORMATS:
+        raise ValueError("Unknown export format %r, expected one of %s" % (format, sorted(FORMATS)))
+
+    if compress:
+        import gzip
+
+    written = 0
+
+    for page, resource_data in enumerate(pages, start_page):
+        out = gzip.GzipFile(fileobj=fileobj, mode="wb") if compress else fileobj
+        writer = FORMATS[format](out, fields)
+
+        if page == 0:
+            writer.write_header()
+
+        items = resource_data[list_key]
+        writer.write_rows(items)
+        written += len(items)
+
+        if compress:
+            out.close()
+        fileobj.flush()
+
+        if checkpoint:
+            checkpoint(page + 1)
+
+    return written
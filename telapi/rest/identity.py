@@ -0,0 +1,52 @@
+import threading
+import weakref
+
+
+class IdentityMap(object):
+    """Hands out one resource object per URL for as long as something holds on to it
+
+    Objects are weakly referenced, so the map never keeps a resource alive by
+    itself. `hits` and `misses` count lookups that did and didn't find an
+    existing object.
+    """
+
+    def __init__(self):
+        self.hits     = 0
+        self.misses   = 0
+        self._objects = weakref.WeakValueDictionary()
+        self._lock    = threading.Lock()
+
+    def get(self, url, create):
+        """Returns the object for `url`, calling `create()` to make it if there is none"""
+        with self._lock:
+            resource = self._objects.get(url)
+
+            if resource is not None:
+                self.hits += 1
+                return resource
+
+            self.misses += 1
+            resource = self._objects[url] = create()
+
+            return resource
+
+    def invalidate(self, url=None):
+        """Forgets the object at `url` and everything under it, or every object without `url`
+
+        The next lookup builds (and fetches) a fresh object. Objects already
+        handed out are left as they are.
+        """
+        with self._lock:
+            if url is None:
+                self._objects.clear()
+                return
+
+            for key in self._objects.keys():
+                if key == url or key.startswith(url + "/"):
+                    self._objects.pop(key, None)
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, url):
+        return url in self._objects
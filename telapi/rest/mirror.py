@@ -0,0 +1,135 @@
+import json
+import threading
+
+from columns import COLUMN_TYPES, parse_timestamp
+
+
+# Columns indexed when the resource has them
+INDEXED_COLUMNS = ("to", "from", "status", "date_created")
+
+_SQL_TYPES = {
+    "int"       : "INTEGER",
+    "float"     : "REAL",
+    "timestamp" : "INTEGER",
+}
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+class Mirror(object):
+    """Local SQLite copy of the resources a Client fetches
+
+    Pass one to a Client as `mirror` and every item it reads, whether from a
+    list page or a single fetch, is written to a table named after the
+    resource (e.g. "calls"), with a column per schema attribute. The table is
+    keyed on `sid`, with indexes on to, from, status and date_created where
+    the resource has them. Dates are stored as seconds since the epoch so they
+    can be compared, and nested values as JSON. Resources without a sid are not
+    mirrored.
+
+    `ListResource.query()` reads the mirror back without touching the API.
+    """
+
+    def __init__(self, path=":memory:"):
+        # Only clients that keep a mirror load SQLite
+        import sqlite3
+
+        self.path        = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock       = threading.Lock()
+        self._tables     = {}
+
+    def _table(self, element, attributes):
+        """Creates the table for `element` if needed, returning its columns"""
+        columns = self._tables.get(element)
+        if columns is not None:
+            return columns
+
+        columns = tuple(str(name) for name in attributes)
+        definitions = ["%s %s" % (_quote(name), _SQL_TYPES.get(COLUMN_TYPES.get(name), "TEXT")) +
+            (" PRIMARY KEY" if name == "sid" else "") for name in columns]
+
+        self._connection.execute("CREATE TABLE IF NOT EXISTS %s (%s, _data TEXT)" % (_quote(element),
+            ", ".join(definitions)))
+
+        for name in INDEXED_COLUMNS:
+            if name in columns:
+                self._connection.execute("CREATE INDEX IF NOT EXISTS %s ON %s (%s)" % (
+                    _quote("%s_%s" % (element, name)), _quote(element), _quote(name)))
+
+        self._tables[element] = columns
+        return columns
+
+    def _row(self, columns, item):
+        row = []
+
+        for name in columns:
+            value = item.get(name)
+
+            if COLUMN_TYPES.get(name) == "timestamp":
+                value = parse_timestamp(value)
+            elif isinstance(value, (dict, list)):
+                value = json.dumps(value)
+
+            row.append(value)
+
+        row.append(json.dumps(item))
+        return row
+
+    def store(self, element, attributes, items):
+        """Inserts or replaces `items` of the resource `element`"""
+        if "sid" not in attributes or not items:
+            return
+
+        with self._lock:
+            columns = self._table(element, attributes)
+
+            self._connection.executemany("INSERT OR REPLACE INTO %s VALUES (%s)" % (_quote(element),
+                ", ".join("?" * (len(columns) + 1))), [self._row(columns, item) for item in items])
+            self._connection.commit()
+
+    def query(self, element, attributes, where=None, params=(), order_by=None, limit=None, **equals):
+        """Returns the stored items of `element` matching `where` and the `equals` conditions
+
+        `where` is an SQL expression over the attribute columns (quote "to" and
+        "from") with `params` for its placeholders. `equals` maps attribute
+        names to the value they must have.
+        """
+        if "sid" not in attributes:
+            return []
+
+        conditions = []
+        params = list(params)
+
+        if where:
+            conditions.append("(%s)" % where)
+
+        for name, value in sorted(equals.items()):
+            if name not in attributes:
+                raise AttributeError("%s is not an attribute of %s" % (name, element))
+
+            if COLUMN_TYPES.get(name) == "timestamp" and isinstance(value, basestring):
+                value = parse_timestamp(value)
+
+            conditions.append("%s = ?" % _quote(name))
+            params.append(value)
+
+        sql = "SELECT _data FROM %s" % _quote(element)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if order_by:
+            sql += " ORDER BY " + order_by
+        if limit is not None:
+            sql += " LIMIT %d" % limit
+
+        with self._lock:
+            self._table(element, attributes)
+            rows = self._connection.execute(sql, params).fetchall()
+
+        return [json.loads(data) for data, in rows]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,115 @@
+import os
+import time
+import threading
+
+from telapi.utils import resource_name
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class TokenBucket(object):
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.time, sleep=time.sleep):
+        self.rate     = float(rate)
+        self.capacity = float(capacity or rate)
+        self.clock    = clock
+        self.sleep    = sleep
+        self._tokens  = self.capacity
+        self._updated = clock()
+        self._lock    = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Blocks until `tokens` are available and takes them"""
+        while True:
+            with self._lock:
+                self._tokens, self._updated, wait = self._take(self._tokens, self._updated, tokens)
+
+            if not wait:
+                return
+
+            self.sleep(wait)
+
+    def _take(self, available, updated, tokens):
+        """Refills the bucket and returns ``(tokens left, refill time, seconds to wait)``"""
+        now = self.clock()
+        available = min(self.capacity, available + (now - updated) * self.rate)
+
+        if available >= tokens:
+            return available - tokens, now, 0
+
+        return available, now, (tokens - available) / self.rate
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket kept in a file, so worker processes on one host share a single limit
+
+    The file is locked with `fcntl.flock` while the bucket is updated, which
+    requires a POSIX system.
+    """
+
+    def __init__(self, path, rate, capacity=None, clock=time.time, sleep=time.sleep):
+        if fcntl is None:
+            raise NotImplementedError("FileTokenBucket requires fcntl")
+
+        super(FileTokenBucket, self).__init__(rate, capacity, clock, sleep)
+        self.path = path
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                wait = self._acquire_locked(tokens)
+
+            if not wait:
+                return
+
+            self.sleep(wait)
+
+    def _acquire_locked(self, tokens):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            state = os.read(fd, 64).split()
+            if len(state) == 2:
+                available, updated = float(state[0]), float(state[1])
+            else:
+                available, updated = self.capacity, self.clock()
+
+            available, updated, wait = self._take(available, updated, tokens)
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, "%r %r" % (available, updated))
+
+            return wait
+        finally:
+            os.close(fd)
+
+
+class RateLimiter(object):
+    """Paces requests made through a Client using token buckets
+
+    `buckets` maps a rule to a bucket. Rules are "*" (every request), an HTTP
+    method ("POST"), a resource name from the schema ("calls"), or both
+    ("POST calls", i.e. calls.create()). A request takes a token from every
+    bucket whose rule matches it, so a tighter rule applies on top of the
+    account-wide one.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = dict(buckets)
+
+    def acquire(self, method, resource_uri):
+        name = resource_name(resource_uri)
+
+        for rule in ("*", method, name, "%s %s" % (method, name)):
+            bucket = self.buckets.get(rule)
+            if bucket is not None:
+                bucket.acquire()
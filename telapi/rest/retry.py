@@ -0,0 +1,61 @@
+import time
+import random
+
+
+class RetryPolicy(object):
+    """Decides which failed requests are sent again and how long to wait first
+
+    Connection errors and responses with a status in `statuses` are retried up
+    to `max_retries` times for the HTTP `methods` listed (idempotent GET and
+    DELETE by default, add "POST" to opt in creates and updates). Waits grow
+    exponentially from `backoff_factor` seconds up to `max_backoff`, with full
+    jitter, unless the response carries a `Retry-After` header.
+    """
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30, statuses=(429, 500, 502, 503, 504),
+            methods=("GET", "DELETE"), jitter=True, sleep=time.sleep):
+        self.max_retries    = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff    = max_backoff
+        self.statuses       = frozenset(statuses)
+        self.methods        = frozenset(methods)
+        self.jitter         = jitter
+        self.sleep          = sleep
+
+    def should_retry(self, method, retries, status_code=None):
+        """`status_code` is None when the request failed to connect"""
+        if retries >= self.max_retries or method not in self.methods:
+            return False
+
+        return status_code is None or status_code in self.statuses
+
+    def backoff(self, retries, retry_after=None):
+        """Seconds to wait before retry number `retries` + 1"""
+        if retry_after:
+            delay = parse_retry_after(retry_after)
+            if delay is not None:
+                return delay
+
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** retries))
+
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        return delay
+
+
+def parse_retry_after(value):
+    """Seconds to wait for a `Retry-After` header given as seconds or an HTTP date"""
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+
+    # Only HTTP dates need the (slow to import) email package
+    import email.utils
+
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+
+    return max(0, email.utils.mktime_tz(parsed) - time.time())
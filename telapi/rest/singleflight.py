@@ -0,0 +1,55 @@
+import sys
+import threading
+
+from executor import Future
+
+
+class SingleFlight(object):
+    """Lets only one of several concurrent identical calls run, sharing its outcome with the rest
+
+    `calls` counts the calls that ran and `coalesced` the ones that waited
+    for another instead, i.e. the requests saved.
+    """
+
+    def __init__(self):
+        self.calls     = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock     = threading.Lock()
+
+    def do(self, key, func):
+        """Returns `func()`, or the result of the call already running for `key`
+
+        Errors (including KeyboardInterrupt and SystemExit) are raised in every
+        caller waiting on the call that failed.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+
+            if leader:
+                self.calls += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException:
+            exc_info = sys.exc_info()
+            self._finish(key)
+            future.set_exc_info(exc_info)
+            raise
+
+        self._finish(key)
+        future.set_result(result)
+
+        return result
+
+    def _finish(self, key):
+        # Callers arriving from now on start a new call rather than get this (possibly stale) result
+        with self._lock:
+            del self._inflight[key]
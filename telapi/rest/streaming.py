@@ -0,0 +1,143 @@
+import re
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _ChunkReader(object):
+    """Tokenizes JSON that arrives in chunks, keeping only the undecoded tail in memory"""
+
+    def __init__(self, chunks, raw_decode):
+        self._chunks     = iter(chunks)
+        self._raw_decode = raw_decode
+        self._buffer     = ''
+        self._pos        = 0
+        self._eof        = False
+
+    def _fill(self):
+        """Appends the next chunk to the buffer, returning False at the end of the body"""
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer = self._buffer[self._pos:] + chunk
+                self._pos = 0
+                return True
+
+        self._eof = True
+        return False
+
+    def peek(self):
+        """Next non-whitespace character"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON")
+
+    def expect(self, *chars):
+        char = self.peek()
+
+        if char not in chars:
+            raise ValueError("Expected %s but found %r" % (" or ".join(chars), char))
+
+        self._pos += 1
+        return char
+
+    def value(self):
+        """Decodes the next complete JSON value"""
+        self.peek()
+
+        while True:
+            try:
+                value, end = self._raw_decode(self._buffer, self._pos)
+
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+
+            self._fill()
+
+
+def iter_list_items(chunks, list_key, metadata, raw_decode):
+    """Yields the items of a list page's `list_key` array as soon as each one is complete
+
+    `chunks` is the response body in pieces. Every other top-level key is
+    decoded into `metadata` as it is reached. The API puts some of them after
+    the array, so `metadata` is only complete once the generator is exhausted.
+    """
+    reader = _ChunkReader(chunks, raw_decode)
+
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+
+    while True:
+        key = reader.value()
+        reader.expect(':')
+
+        if key == list_key and reader.peek() == '[':
+            reader.expect('[')
+
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield reader.value()
+
+                    if reader.expect(',', ']') == ']':
+                        break
+        else:
+            metadata[key] = reader.value()
+
+        if reader.expect(',', '}') == '}':
+            return
+
+
+class PageStream(object):
+    """A page of a list resource whose items are decoded while the response is still arriving
+
+    Iterate over it once to get the items. `metadata` holds the page's other
+    fields (total, start, end...) as they are parsed. The response is closed,
+    and its connection goes back to the pool, once iteration finishes or stops
+    early; call `close()` (or use the stream in a ``with`` block) to let go of
+    a stream that won't be iterated to the end.
+    """
+
+    def __init__(self, response, list_key, raw_decode, hydrate, chunk_size=16384):
+        self.metadata  = {}
+        self._response = response
+        self._items    = iter_list_items(response.iter_content(chunk_size), list_key, self.metadata, raw_decode)
+        self._hydrate  = hydrate
+
+    def __iter__(self):
+        try:
+            for item in self._items:
+                yield self._hydrate(item)
+        finally:
+            self.close()
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def total(self):
+        return self.metadata.get("total")
+
+    @property
+    def start(self):
+        return self.metadata.get("start")
+
+    @property
+    def end(self):
+        return self.metadata.get("end")
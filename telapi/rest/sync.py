@@ -0,0 +1,77 @@
+import os
+import json
+import itertools
+
+from columns import parse_timestamp
+
+
+class SyncState(object):
+    """Watermark of an incremental sync, kept as JSON in the file at `path`
+
+    `watermark` is the newest `date_created` seen (in seconds since the epoch)
+    and `recent` maps the sid of every item created within the lookback window
+    below it to ``[date_created, date_updated]``.
+    """
+
+    def __init__(self, path):
+        self.path      = path
+        self.watermark = None
+        self.recent    = {}
+
+        if os.path.exists(path):
+            with open(path) as state_file:
+                state = json.load(state_file)
+
+            self.watermark = state["watermark"]
+            self.recent    = state["recent"]
+
+    def save(self):
+        # Write a new file and rename it over the old one, so a crash never leaves half a state behind
+        temp_path = self.path + ".tmp"
+
+        with open(temp_path, "w") as state_file:
+            json.dump({"watermark": self.watermark, "recent": self.recent}, state_file)
+            state_file.flush()
+            os.fsync(state_file.fileno())
+
+        os.rename(temp_path, self.path)
+
+
+def iter_changes(pages, list_key, state, lookback=0):
+    """Yields the items of newest-first `pages` that are new or changed since `state`
+
+    Stops at the first item created more than `lookback` seconds before the
+    watermark. Within the lookback window, items are yielded again only if
+    their `date_updated` changed. Items that slide onto the next page while it
+    is being fetched are only yielded once. `state` is updated and saved when
+    the scan finishes.
+    """
+    cutoff = None if state.watermark is None else state.watermark - lookback
+    seen   = {}
+
+    for item in itertools.chain.from_iterable(resource_data[list_key] for resource_data in pages):
+        created = parse_timestamp(item.get("date_created"))
+
+        if cutoff is not None and created is not None and created < cutoff:
+            break
+
+        sid = item["sid"]
+        if sid in seen:
+            continue
+
+        seen[sid] = [created, item.get("date_updated")]
+
+        if state.recent.get(sid) != seen[sid]:
+            yield item
+
+    created = [entry[0] for entry in seen.values() if entry[0] is not None]
+    if state.watermark is not None:
+        created.append(state.watermark)
+
+    if created:
+        state.watermark = max(created)
+        state.recent.update(seen)
+        state.recent = dict((sid, entry) for sid, entry in state.recent.items()
+            if entry[0] is not None and entry[0] >= state.watermark - lookback)
+
+    state.save()
@@ -1,5 +1,58 @@
+import collections
 import json
 import os
+import threading
 
 SCHEMA_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'telapi.json')
-SCHEMA = json.load(open(SCHEMA_FILE))
+
+
+class LazySchema(collections.Mapping):
+    """Read-only mapping over the schema file, which is only parsed on first access
+
+    It has the read-only methods of the dict it stands in for, with `copy()`
+    returning a plain dict.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._data = None
+        self._lock = threading.Lock()
+
+    def _loaded(self):
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    with open(self._path) as schema_file:
+                        self._data = json.load(schema_file)
+
+        return self._data
+
+    def __getitem__(self, key):
+        return self._loaded()[key]
+
+    def __contains__(self, key):
+        return key in self._loaded()
+
+    def __iter__(self):
+        return iter(self._loaded())
+
+    def __len__(self):
+        return len(self._loaded())
+
+    def get(self, key, default=None):
+        return self._loaded().get(key, default)
+
+    def keys(self):
+        return self._loaded().keys()
+
+    def items(self):
+        return self._loaded().items()
+
+    def has_key(self, key):
+        return key in self._loaded()
+
+    def copy(self):
+        return self._loaded().copy()
+
+
+SCHEMA = LazySchema(SCHEMA_FILE)
@@ -1,4 +1,5 @@
 import functools
+from telapi.schema import SCHEMA
 
 class memoized(object):
    '''Decorator. Caches a function's return value each time it is called.
@@ -25,3 +26,26 @@ class memoized(object):
    def __get__(self, obj, objtype):
       '''Support instance methods.'''
       return functools.partial(self.__call__, obj)
+
+
+
+@memoized
+def _component_urls():
+   """Maps a component's URL (e.g. "SMS/Messages") to its name in the schema (e.g. "sms_messages")"""
+   return dict((properties["url"], name) for name, properties in SCHEMA["rest_api"]["components"].items())
+
+def resource_name(resource_uri):
+   """Schema name of the list or instance resource a REST request URI points at"""
+   parts = resource_uri.split("?")[0].rsplit(".", 1)[0].strip("/").split("/")
+
+   # List URIs end in the component URL, instance URIs have a SID after it
+   for end in (len(parts), len(parts) - 1):
+      for length in (2, 1):
+         if end - length < 0:
+            continue
+
+         name = _component_urls().get("/".join(parts[end - length:end]))
+         if name:
+            return name
+
+   return None
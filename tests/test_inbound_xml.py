@@ -3,6 +3,9 @@ import os
 sys.path.append(os.getcwd() + '/..')
 
 import unittest
+from StringIO import StringIO
+from xml.parsers.expat import ExpatError
+from mock import patch
 from telapi import inboundxml
 
 class TestAllTelml(unittest.TestCase):
@@ -146,5 +149,166 @@ class TestAllTelml(unittest.TestCase):
         self.response.append(inboundxml.PlayLastRecording())
         self.assertEqual(str(self.response), '<Response><PlayLastRecording></PlayLastRecording></Response>')
 
+    # Serializing
+    def test_write(self):
+        self.response.append(inboundxml.Gather(inboundxml.Say('Press 1'), action="http://foo.com/?a=1&b=2"))
+        expected = '<Response><Gather action="http://foo.com/?a=1&amp;b=2"><Say>Press 1</Say></Gather></Response>'
+
+        output = StringIO()
+        self.response.write(output)
+        self.assertEqual(output.getvalue(), expected)
+
+        # A WSGI body
+        body = []
+        self.response.write(body)
+        self.assertEqual(''.join(body), expected)
+
+    def test_unicode(self):
+        self.response.append(inboundxml.Say(u'Gr\xfc\xdfe <3', voice='woman'))
+        self.assertEqual(str(self.response), '<Response><Say voice="woman">Gr\xc3\xbc\xc3\x9fe &lt;3</Say></Response>')
+        self.assertEqual(unicode(self.response), u'<Response><Say voice="woman">Gr\xfc\xdfe &lt;3</Say></Response>')
+
+    def test_quoted_attribute(self):
+        self.response.append(inboundxml.Redirect('http://foo.com', method='"POST"'))
+        self.assertEqual(str(self.response), '<Response><Redirect method="&quot;POST&quot;">http://foo.com</Redirect></Response>')
+
+    def test_nested_blank(self):
+        self.response.append(inboundxml.Gather(inboundxml.Say('Hi'), inboundxml.Say('  ')))
+        with self.assertRaises(ValueError):
+            self.response.write([])
+
+    # Templates
+    def test_template(self):
+        def menu(prompt, action):
+            return inboundxml.Response(
+                inboundxml.Gather(inboundxml.Say(prompt, voice='woman'), action=action, numDigits=1),
+                inboundxml.Pause())
+
+        template = menu(inboundxml.Placeholder('prompt'), inboundxml.Placeholder('action')).compile()
+        self.assertEqual(template.names, frozenset(['prompt', 'action']))
+
+        for prompt, action in [('Press 1', 'http://foo.com/menu'), (u'Dr\xfccken Sie <1>', 'http://foo.com/?a="1"&b=2')]:
+            self.assertEqual(template.render(prompt=prompt, action=action), str(menu(prompt, action)))
+
+        body = []
+        template.write(body, prompt='Press 1', action='http://foo.com/menu')
+        self.assertEqual(''.join(body), str(menu('Press 1', 'http://foo.com/menu')))
+
+        with self.assertRaises(KeyError):
+            template.render(prompt='Press 1')
+
+        with self.assertRaises(ValueError):
+            template.render(prompt=' ', action='http://foo.com/menu')
+
+    def test_template_validation(self):
+        say = inboundxml.Say('Hi')
+        say._children.append(inboundxml.Say('there'))
+        with self.assertRaises(TypeError):
+            inboundxml.Response(say).compile()
+
+        with self.assertRaises(ValueError):
+            inboundxml.Response(inboundxml.Say(), inboundxml.Say(inboundxml.Placeholder('name'))).compile()
+
+        # Unfilled placeholders can't be serialized directly
+        with self.assertRaises(ValueError):
+            str(inboundxml.Response(inboundxml.Say(inboundxml.Placeholder('name'))))
+
+    # Frozen elements
+    def test_freeze(self):
+        menu = inboundxml.Gather(inboundxml.Say('Press 1'), inboundxml.Pause(), action='http://foo.com/menu').freeze()
+        say = menu._children[0]
+
+        with self.assertRaises(AttributeError):
+            menu.action = 'http://foo.com/other'
+        with self.assertRaises(AttributeError):
+            say.body = 'Press 2'
+        with self.assertRaises(AttributeError):
+            del menu.action
+        with self.assertRaises(TypeError):
+            menu.append(inboundxml.Say('Press 2'))
+
+        expected = '<Gather action="http://foo.com/menu"><Say>Press 1</Say><Pause></Pause></Gather>'
+        self.assertEqual(str(menu), expected)
+
+        # Spliced into mutable parents as is
+        self.response.append(inboundxml.Say(u'Gr\xfc\xdfe'))
+        self.response.append(menu)
+        self.assertEqual(str(self.response), '<Response><Say>Gr\xc3\xbc\xc3\x9fe</Say>%s</Response>' % expected)
+
+        template = inboundxml.Response(inboundxml.Say(inboundxml.Placeholder('name')), menu).compile()
+        self.assertEqual(template.render(name='Bob'), '<Response><Say>Bob</Say>%s</Response>' % expected)
+
+        with self.assertRaises(ValueError):
+            inboundxml.Say().freeze()
+
+    def test_delattr(self):
+        say = inboundxml.Say('Hi', voice='woman', loop=2)
+        del say.voice
+        self.assertEqual(str(say), '<Say loop="2">Hi</Say>')
+
+    def test_slots(self):
+        say = inboundxml.Say('Hi', voice='woman')
+        self.assertFalse(hasattr(say, '__dict__'))
+        self.assertEqual(say._element_name, 'Say')
+        self.assertTrue(isinstance(inboundxml.Gather._allowed_children, frozenset))
+
+        with self.assertRaises(AttributeError):
+            say.loops = 5
+
+    # Parsing
+    def test_parse_round_trip(self):
+        self.response.append(inboundxml.Say(u'Gr\xfc\xdfe <3', voice='woman'))
+        self.response.append(inboundxml.Gather(inboundxml.Say('Press 1'), inboundxml.Pause(),
+            action='http://foo.com/?a="1"&b=2', numDigits=1))
+        self.response.append(inboundxml.Dial(inboundxml.Number('+15552223456'), callerId='+15550001111'))
+        self.response.append(inboundxml.Sms(from_number="+15556669999", to_number="+12223334444", body="Hi there!"))
+        xml = str(self.response)
+
+        parsed = inboundxml.parse(xml)
+        self.assertEqual(parsed.__class__, inboundxml.Response)
+        self.assertEqual(parsed._children[1].__class__, inboundxml.Gather)
+        self.assertEqual(str(parsed), xml)
+
+        # From a file, a few bytes at a time
+        with patch('telapi.inboundxml.parser.READ_SIZE', 7):
+            self.assertEqual(str(inboundxml.parse(StringIO(xml))), xml)
+
+        # Formatting whitespace between elements is dropped
+        self.assertEqual(str(inboundxml.parse('<Response>\n  <Say> Hi </Say>\n</Response>\n')),
+            '<Response><Say> Hi </Say></Response>')
+
+    def test_parse_validation(self):
+        with self.assertRaises(TypeError):
+            inboundxml.parse('<Response><Say>Hi<Say>there</Say></Say></Response>')
+        with self.assertRaises(TypeError):
+            inboundxml.parse('<Response><Speak>Hi</Speak></Response>')
+        with self.assertRaises(AttributeError):
+            inboundxml.parse('<Response><Say loops="5">Hi</Say></Response>')
+        with self.assertRaises(ValueError):
+            inboundxml.parse('<Response><Say> </Say></Response>')
+        with self.assertRaises(ValueError):
+            inboundxml.parse('<Response>Hi<Say>there</Say></Response>')
+        with self.assertRaises(ExpatError):
+            inboundxml.parse('<Response><Say>Hi</Response>')
+
+    def test_iterparse(self):
+        xml = '<Response>%s</Response>' % ''.join('<Gather numDigits="1"><Say>Menu %d</Say></Gather>' % i
+            for i in range(100))
+
+        with patch('telapi.inboundxml.parser.READ_SIZE', 64):
+            events = list(inboundxml.iterparse(StringIO(xml)))
+
+        verbs = [element for event, element in events if element.__class__ is inboundxml.Gather]
+        self.assertEqual(len(verbs), 100)
+        self.assertEqual(str(verbs[42]), '<Gather numDigits="1"><Say>Menu 42</Say></Gather>')
+
+        # The root comes last and doesn't hold on to the verbs
+        root = events[-1][1]
+        self.assertEqual(root.__class__, inboundxml.Response)
+        self.assertEqual(root._children, [])
+
+        starts = [element._element_name for event, element in inboundxml.iterparse(xml, events=("start",))]
+        self.assertEqual(starts[:3], ['Response', 'Gather', 'Say'])
+
 if __name__ == '__main__':
     unittest.main()
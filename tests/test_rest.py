@@ -4,10 +4,110 @@ sys.path.append(os.getcwd() + '/..')
 
 import unittest
 import json
+import threading
+import tempfile
+import time
+import subprocess
+import csv
+import gzip
+from StringIO import StringIO
+import requests
 from mock import patch
 from telapi import rest
+from telapi.rest.retry import RetryPolicy
+from telapi.rest.ratelimit import RateLimiter, TokenBucket, FileTokenBucket
+from telapi.rest.cache import ResponseCache
+from telapi.rest.decoder import JSONDecoder
+from telapi.rest.columns import parse_timestamp
+from collections import OrderedDict
 from telapi.schema import SCHEMA
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def fake_pages(total, list_key='calls', requests=None):
+    """Fakes `Client._send_request` for a list of `total` rows, recording the params of each request"""
+    def send_request(resource_uri, method, params=None):
+        if requests is not None:
+            requests.append(dict(params))
+
+        page, page_size = params["Page"], params["PageSize"]
+        start = page * page_size
+        end = min(start + page_size, total)
+
+        return {
+            "page"      : page,
+            "page_size" : page_size,
+            "num_pages" : (total + page_size - 1) // page_size,
+            "total"     : total,
+            "start"     : start,
+            "end"       : end - 1,
+            list_key    : [{"sid": "CA%032d" % i} for i in range(start, end)],
+        }
+
+    return send_request
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content     = content
+        self.headers     = headers or {}
+        self.closed      = False
+
+    def close(self):
+        self.closed = True
+
+    def iter_content(self, chunk_size=1):
+        for i in xrange(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+class FakeSession(object):
+    """Stands in for `requests.Session`, replaying queued responses (or raising queued exceptions)"""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests  = []
+        self.headers   = {}
+
+    def _request(self, method, url, **kwargs):
+        self.requests.append((method, url))
+        response = self.responses.pop(0)
+
+        if isinstance(response, Exception):
+            raise response
+
+        return response
+
+    def get(self, url, **kwargs):
+        return self._request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._request("DELETE", url, **kwargs)
+
+
+class BlockingSession(FakeSession):
+    """FakeSession whose requests wait until `release` is set"""
+    def __init__(self, responses):
+        super(BlockingSession, self).__init__(responses)
+        self.release = threading.Event()
+
+    def _request(self, method, url, **kwargs):
+        self.release.wait(5)
+        return super(BlockingSession, self)._request(method, url, **kwargs)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.001)
+
 
 class TestREST(unittest.TestCase):
 
@@ -25,6 +125,39 @@ class TestREST(unittest.TestCase):
             self.client.bad_resource_name
 
 
+    def test_generated_class_import(self):
+        # In a fresh interpreter, where no resource class has been created yet
+        script = ("import telapi.rest\n"
+                  "from telapi.rest import Call, CallListResource\n"
+                  "print Call.__name__, CallListResource.__name__, hasattr(telapi.rest, 'AsyncCallListResource')")
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=os.path.join(os.getcwd(), '..'))
+        self.assertEqual(output.split(), ["Call", "CallListResource", "True"])
+
+        self.assertTrue(isinstance(self.client.accounts[self.client.account_sid].calls, rest.CallListResource))
+        self.assertFalse(hasattr(rest, 'BadResourceListResource'))
+
+
+    def test_lazy_imports(self):
+        # Optional features load their heavy dependencies only when they're used
+        script = ("import sys, telapi.rest\n"
+                  "print [name for name in ('numpy', 'gzip', 'csv', 'sqlite3') if name in sys.modules]")
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=os.path.join(os.getcwd(), '..'))
+        self.assertEqual(output.strip(), "[]")
+
+
+    def test_schema_mapping(self):
+        # SCHEMA keeps the read-only interface of the dict it used to be
+        schema = json.load(open(os.path.join(os.getcwd(), '..', 'telapi', 'data', 'telapi.json')))
+
+        self.assertEqual(SCHEMA, schema)
+        self.assertEqual(sorted(SCHEMA.values()), sorted(schema.values()))
+        self.assertEqual(dict(SCHEMA.iteritems()), schema)
+        self.assertEqual(sorted(SCHEMA.itervalues()), sorted(schema.itervalues()))
+        self.assertTrue(SCHEMA.has_key("rest_api"))
+        self.assertEqual(SCHEMA.copy(), schema)
+        self.assertTrue(isinstance(SCHEMA.copy(), dict))
+
+
     def test_bad_credentials_account(self):
         with self.assertRaises(rest.exceptions.AccountSidError):
             rest.Client(account_sid='abc123')
@@ -34,6 +167,310 @@ class TestREST(unittest.TestCase):
         with self.assertRaises(rest.exceptions.AuthTokenError):
             rest.Client(account_sid=self.test_sid, auth_token='abc123')
 
+    def test_connection_pool(self):
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, pool_connections=2, pool_maxsize=64)
+        adapter = client.session.get_adapter(client.base_url)
+
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 64)
+
+    @patch("telapi.rest.Client._send_request")
+    def test_concurrent_iteration(self, mock):
+        mock.side_effect = fake_pages(50)
+
+        calls = self.client.accounts[self.client.account_sid].calls[0:50]
+        expected = ["CA%032d" % i for i in range(50)]
+        results, errors = [], []
+
+        def iterate():
+            try:
+                for i in range(3):
+                    results.append([call.sid for call in calls])
+            except Exception, e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=iterate) for i in range(64)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 64 * 3)
+        for sids in results:
+            self.assertEqual(sids, expected)
+
+        # The shared list was only fetched once
+        self.assertEqual(mock.call_count, 1)
+
+    #
+    #  - Retries -
+    #
+    def retry_client(self, responses, **policy):
+        sleeps = []
+        policy.setdefault("jitter", False)
+        session = FakeSession(responses)
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session,
+            retry=RetryPolicy(sleep=sleeps.append, **policy))
+
+        return client, session, sleeps
+
+    def test_retry_server_errors(self):
+        account = open('mock-response/view-account.json').read()
+        client, session, sleeps = self.retry_client([FakeResponse(503, ''), FakeResponse(500, ''), FakeResponse(200, account)], backoff_factor=1)
+
+        self.assertEqual(client.accounts[self.test_sid].status, 'active')
+        self.assertEqual(len(session.requests), 3)
+        self.assertEqual(sleeps, [1, 2])
+
+    def test_retry_after(self):
+        account = open('mock-response/view-account.json').read()
+        client, session, sleeps = self.retry_client([FakeResponse(429, '', {"Retry-After": "7"}), FakeResponse(200, account)])
+
+        client._get("Accounts/%s.json" % self.test_sid)
+        self.assertEqual(sleeps, [7])
+
+    def test_retry_exhausted(self):
+        error = '{"code": 11200, "message": "Busy", "more_info": "http://www.telapi.com/docs/"}'
+        client, session, sleeps = self.retry_client([FakeResponse(503, error)] * 3, max_retries=2)
+
+        with self.assertRaises(rest.exceptions.RequestError) as context:
+            client._get("Accounts/%s.json" % self.test_sid)
+
+        self.assertEqual(context.exception.retries, 2)
+        self.assertEqual(context.exception.error_code, 11200)
+        self.assertEqual(len(session.requests), 3)
+
+    def test_retry_post_opt_in(self):
+        sent = open('mock-response/send-sms.json').read()
+
+        client, session, sleeps = self.retry_client([FakeResponse(503, ''), FakeResponse(200, sent)])
+        with self.assertRaises(rest.exceptions.RequestError) as context:
+            client._post("Accounts/%s/SMS/Messages.json" % self.test_sid, {})
+        self.assertEqual(context.exception.retries, 0)
+
+        client, session, sleeps = self.retry_client([FakeResponse(503, ''), FakeResponse(200, sent)], methods=("GET", "DELETE", "POST"))
+        self.assertTrue(client._post("Accounts/%s/SMS/Messages.json" % self.test_sid, {})["sid"].startswith("SM"))
+
+    def test_retry_connection_error(self):
+        account = open('mock-response/view-account.json').read()
+        client, session, sleeps = self.retry_client([requests.exceptions.ConnectionError(), FakeResponse(200, account)])
+        self.assertEqual(client._get("Accounts/%s.json" % self.test_sid)["status"], "active")
+
+        client, session, sleeps = self.retry_client([requests.exceptions.ConnectionError()] * 2, max_retries=1)
+        with self.assertRaises(requests.exceptions.ConnectionError) as context:
+            client._get("Accounts/%s.json" % self.test_sid)
+        self.assertEqual(context.exception.retries, 1)
+
+    def test_retry_backoff(self):
+        policy = RetryPolicy(backoff_factor=0.5, max_backoff=3, jitter=False)
+        self.assertEqual([policy.backoff(i) for i in range(5)], [0.5, 1, 2, 3, 3])
+
+        policy = RetryPolicy(backoff_factor=0.5, max_backoff=3)
+        self.assertTrue(all(0 <= policy.backoff(i) <= 3 for i in range(10)))
+
+        self.assertEqual(policy.backoff(0, "Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+
+    #
+    #  - Rate limiting -
+    #
+    def fake_clock(self):
+        now = [1000.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        return (lambda: now[0]), sleep, sleeps
+
+    def test_token_bucket(self):
+        clock, sleep, sleeps = self.fake_clock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=sleep)
+
+        for i in range(4):
+            bucket.acquire()
+
+        self.assertEqual(sleeps, [0.5, 0.5])
+
+    def test_file_token_bucket(self):
+        clock, sleep, sleeps = self.fake_clock()
+        path = tempfile.mktemp()
+
+        try:
+            # Two buckets on the same file stand in for two worker processes
+            first = FileTokenBucket(path, rate=1, capacity=2, clock=clock, sleep=sleep)
+            second = FileTokenBucket(path, rate=1, capacity=2, clock=clock, sleep=sleep)
+
+            first.acquire()
+            second.acquire()
+            self.assertEqual(sleeps, [])
+
+            first.acquire()
+            self.assertEqual(sleeps, [1.0])
+        finally:
+            os.remove(path)
+
+    def test_rate_limiter_rules(self):
+        clock, sleep, sleeps = self.fake_clock()
+        buckets = {
+            "*"             : TokenBucket(rate=100, clock=clock, sleep=sleep),
+            "POST calls"    : TokenBucket(rate=1, clock=clock, sleep=sleep),
+        }
+
+        responses = [FakeResponse(200, open('mock-response/view-call.json').read()) for i in range(4)]
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=FakeSession(responses),
+            rate_limiter=RateLimiter(buckets))
+
+        client._get("Accounts/%s/Calls/CA1.json" % self.test_sid)
+        client._get("Accounts/%s/Calls.json" % self.test_sid)
+        self.assertEqual(sleeps, [])
+
+        client._post("Accounts/%s/Calls.json" % self.test_sid, {})
+        client._post("Accounts/%s/Calls.json" % self.test_sid, {})
+        self.assertEqual(sleeps, [1.0])
+
+    #
+    #  - Response cache -
+    #
+    def test_cache_hits(self):
+        call = open('mock-response/view-call.json').read()
+        session = FakeSession([FakeResponse(200, call) for i in range(3)])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session, cache=ResponseCache())
+        calls = client.accounts[self.test_sid].calls
+
+        sid = json.loads(call)["sid"]
+        self.assertEqual(calls[sid].status, calls[sid].status)
+        self.assertEqual(len(session.requests), 1)
+        self.assertEqual(client.cache.hits, 1)
+
+        # Writes drop the cached instance
+        calls[sid].delete()
+        calls[sid].fetch()
+        self.assertEqual(len(session.requests), 3)
+
+    def test_cache_ttl_and_revalidation(self):
+        now = [1000.0]
+        call = open('mock-response/view-call.json').read()
+        session = FakeSession([FakeResponse(200, call, {"ETag": '"v1"'}), FakeResponse(304, '')])
+        cache = ResponseCache(ttl=60, ttls={"accounts": 0}, clock=lambda: now[0])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session, cache=cache)
+
+        uri = "Accounts/%s/Calls/CA1.json" % self.test_sid
+        first = client._get(uri)
+        now[0] += 61
+        self.assertTrue(client._get(uri) is first)
+        self.assertEqual(cache.revalidations, 1)
+        self.assertEqual(len(session.requests), 2)
+
+        # Resources with a TTL of 0 aren't cached
+        cache.store("Accounts/%s.json" % self.test_sid, None, {})
+        self.assertEqual(cache.lookup("Accounts/%s.json" % self.test_sid), None)
+
+    def test_cache_lru(self):
+        cache = ResponseCache(max_entries=2)
+
+        for sid in ("CA1", "CA2", "CA3"):
+            cache.store("Accounts/%s/Calls/%s.json" % (self.test_sid, sid), None, {"sid": sid})
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.lookup("Accounts/%s/Calls/CA1.json" % self.test_sid), None)
+        self.assertEqual(cache.lookup("Accounts/%s/Calls/CA3.json" % self.test_sid).data, {"sid": "CA3"})
+
+    #
+    #  - Decoding -
+    #
+    def test_decoder(self):
+        content = open('mock-response/view-account.json').read()
+
+        self.assertEqual(JSONDecoder().decode(content), json.loads(content))
+        self.assertEqual(JSONDecoder(backend=json).backend, json)
+
+        # Hooks are passed through, which rules out decoders without them
+        decoder = JSONDecoder(object_pairs_hook=OrderedDict)
+        self.assertEqual(decoder.decode(content).keys()[:3], ["sid", "friendly_name", "status"])
+
+        with self.assertRaises(ValueError):
+            JSONDecoder().decode('<html>')
+
+    def test_client_decoder(self):
+        content = open('mock-response/view-account.json').read()
+        error = '{"code": 20404, "message": "Not found", "more_info": "http://www.telapi.com/docs/"}'
+        session = FakeSession([FakeResponse(200, content), FakeResponse(404, error)])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session,
+            decoder=JSONDecoder(object_pairs_hook=OrderedDict))
+
+        self.assertTrue(isinstance(client._get("Accounts/%s.json" % self.test_sid), OrderedDict))
+
+        with self.assertRaises(rest.exceptions.RequestError) as context:
+            client._get("Accounts/%s.json" % self.test_sid)
+        self.assertEqual(context.exception.error_code, 20404)
+
+    def test_stream_page(self):
+        content = open('mock-response/list-notifications.json').read()
+        session = FakeSession([FakeResponse(200, content)])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session)
+
+        notifications = client.accounts[self.test_sid].notifications
+        stream = notifications.stream_page(page_size=5, chunk_size=7)
+        items = iter(stream)
+
+        # Metadata ahead of the array is known once the first item has been decoded
+        first = next(items)
+        self.assertEqual(first.sid, json.loads(content)["notifications"][0]["sid"])
+        self.assertEqual(stream.end, 4)
+        self.assertEqual(stream.total, None)
+
+        sids = [first.sid] + [item.sid for item in items]
+        self.assertEqual(sids, [item["sid"] for item in json.loads(content)["notifications"]])
+        self.assertEqual(stream.total, 2092)
+        self.assertEqual(stream.metadata["num_pages"], 418)
+
+        self.assertTrue(stream._response.closed)
+
+        session.responses.append(FakeResponse(200, content))
+        records = notifications.stream_page(records=True)
+        self.assertTrue(all(isinstance(item, rest.Record) for item in records))
+
+        # Streams that are abandoned or never read still give their connection back
+        session.responses.append(FakeResponse(200, content))
+        stream = notifications.stream_page()
+        items = iter(stream)
+        next(items)
+        self.assertFalse(stream._response.closed)
+        items.close()
+        self.assertTrue(stream._response.closed)
+
+        session.responses.append(FakeResponse(200, content))
+        with notifications.stream_page() as stream:
+            pass
+        self.assertTrue(stream._response.closed)
+
+        # Decoders with just decode() work for streamed pages too
+        class DecodeOnly(object):
+            def decode(self, content):
+                return json.loads(content)
+
+        session.responses.append(FakeResponse(200, content))
+        client.decoder = DecodeOnly()
+        self.assertEqual([item.sid for item in notifications.stream_page()], sids)
+
+    def test_stream_page_chunk_boundaries(self):
+        content = '{"total": 123456, "calls": [{"sid": "CA1", "duration": 98765}, {"sid": "CA2"}], "end": 1}'
+        session = FakeSession([FakeResponse(200, content) for i in range(len(content))])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session)
+        calls = client.accounts[self.test_sid].calls
+
+        # Every split point, including ones inside numbers and strings
+        for chunk_size in range(1, len(content) + 1):
+            stream = calls.stream_page(chunk_size=chunk_size)
+            self.assertEqual([(item.sid, item.duration) for item in stream], [("CA1", 98765), ("CA2", None)])
+            self.assertEqual(stream.metadata, {"total": 123456, "end": 1})
+
+        session.responses = [FakeResponse(200, content[:40])]
+        with self.assertRaises(ValueError):
+            list(calls.stream_page(chunk_size=8))
+
     #
     #  - Accounts -  
     #
@@ -105,6 +542,56 @@ class TestREST(unittest.TestCase):
         # Check schema attribute accuracy
         self.assertEqual(set(SCHEMA["rest_api"]["components"].get('sms_messages')['attributes']), set(sms._resource_data.keys()))
 
+    @patch("telapi.rest.Client._send_request")
+    def test_sms_create_many(self, mock):
+        sent = json.load(open('mock-response/send-sms.json','r'))
+
+        def send_request(resource_uri, method, params=None):
+            if params["Body"] == "fail":
+                raise rest.exceptions.RequestError("Error code 13214. Invalid To.", error_code=13214, http_code=400)
+            return sent
+
+        mock.side_effect = send_request
+
+        sms_messages = self.client.accounts[self.client.account_sid].sms_messages
+        items = ({"from_number": self.test_number, "to_number": self.test_number, "body": "fail" if i % 5 == 0 else "Hi"} for i in range(20))
+        results = list(sms_messages.create_many(items, concurrency=4, ordered=True))
+
+        self.assertEqual([index for index, sms, error in results], range(20))
+
+        for index, sms, error in results:
+            if index % 5 == 0:
+                self.assertEqual(sms, None)
+                self.assertEqual(error.error_code, 13214)
+            else:
+                self.assertEqual(error, None)
+                self.assertTrue(sms.sid.startswith('SM'))
+
+        self.assertEqual(sms_messages.create_stats["created"], 16)
+        self.assertEqual(sms_messages.create_stats["failed"], 4)
+        self.assertTrue(sms_messages.create_stats["per_second"] > 0)
+
+        # Unordered results still cover every item
+        results = sms_messages.create_many(({"from_number": self.test_number, "to_number": self.test_number, "body": "Hi"} for i in range(7)), concurrency=3)
+        self.assertEqual(sorted(index for index, sms, error in results), range(7))
+
+        # Connection errors and bad params fail only their own item
+        def send_request(resource_uri, method, params=None):
+            if params["Body"] == "3":
+                raise requests.exceptions.ConnectionError("Connection reset by peer")
+            return sent
+
+        mock.side_effect = send_request
+        items = [{"from_number": self.test_number, "to_number": self.test_number, "body": str(i)} for i in range(10)]
+        items[6]["bogus"] = 1
+
+        results = list(sms_messages.create_many(items, concurrency=4, ordered=True))
+        self.assertEqual([index for index, sms, error in results], range(10))
+        self.assertTrue(isinstance(results[3][2], requests.exceptions.ConnectionError))
+        self.assertTrue(isinstance(results[6][2], AttributeError))
+        self.assertEqual(sms_messages.create_stats["created"], 8)
+        self.assertEqual(sms_messages.create_stats["failed"], 2)
+
     #
     #  - Calls -  
     #
@@ -139,6 +626,30 @@ class TestREST(unittest.TestCase):
         self.assertEqual(call_list[0:3].__class__.__name__, 'CallListResource')
 
 
+    @patch("telapi.rest.Client._send_request")
+    def test_instance_attribute_access(self, mock):
+        mock.return_value = json.load(open('mock-response/view-call.json','r'))
+
+        account = self.client.accounts[self.client.account_sid]
+
+        # Subresource lists are built afresh on every access
+        self.assertFalse(account.calls is account.calls)
+        self.assertEqual(account.calls._url, 'Accounts/%s/Calls' % self.client.account_sid)
+
+        call = account.calls.new(fetched_data=mock.return_value)
+        self.assertEqual(call.from_number, mock.return_value["from"])
+        self.assertEqual(call.recordings.__class__.__name__, 'RecordingListResource')
+
+        call.to_number = '+15555555555'
+        self.assertEqual(call.to_number, '+15555555555')
+        self.assertEqual(getattr(call, 'to'), '+15555555555')
+
+        with self.assertRaises(AttributeError):
+            call.not_an_attribute = 1
+
+        # Attributes keep plain string names so lookups stay on the fast path
+        self.assertTrue(all(type(name) is str for name in vars(call)))
+
     @patch("telapi.rest.Client._send_request")
     def test_create_call(self, mock):
         
@@ -152,6 +663,559 @@ class TestREST(unittest.TestCase):
         self.assertEqual(call.__class__.__name__, 'Call')
 
 
+    @patch("telapi.rest.Client._send_request")
+    def test_slice_fetches_covering_page(self, mock):
+        requests = []
+        mock.side_effect = fake_pages(1000000, requests=requests)
+
+        calls = self.client.accounts[self.client.account_sid].calls[9900:10000]
+
+        self.assertEqual([call.sid for call in calls], ["CA%032d" % i for i in range(9900, 10000)])
+        self.assertEqual(requests, [{"Page": 99, "PageSize": 100}])
+
+    @patch("telapi.rest.Client._send_request")
+    def test_slice_unaligned(self, mock):
+        requests = []
+        mock.side_effect = fake_pages(1000000, requests=requests)
+
+        calls = self.client.accounts[self.client.account_sid].calls
+
+        self.assertEqual([call.sid for call in calls[15:50:5]], ["CA%032d" % i for i in range(15, 50, 5)])
+        self.assertEqual(requests, [{"Page": 0, "PageSize": 46}])
+
+        # Windows wider than the largest page size are split across pages
+        del requests[:]
+        self.assertEqual(len(calls[500:2500]), 2000)
+        self.assertEqual(requests, [{"Page": 0, "PageSize": 834}, {"Page": 1, "PageSize": 834}, {"Page": 2, "PageSize": 834}])
+
+    @patch("telapi.rest.Client._send_request")
+    def test_slice_stepped(self, mock):
+        requests = []
+        mock.side_effect = fake_pages(1000000, requests=requests)
+
+        calls = self.client.accounts[self.client.account_sid].calls
+
+        # Rows a page or more apart are fetched one at a time, not with everything in between
+        self.assertEqual([call.sid for call in calls[0:100000:1000]], ["CA%032d" % i for i in range(0, 100000, 1000)])
+        self.assertEqual(requests, [{"Page": i, "PageSize": 1} for i in range(0, 100000, 1000)])
+
+        del requests[:]
+        self.assertEqual([call.sid for call in calls[5000:2000:-1500]], ["CA%032d" % i for i in (5000, 3500)])
+        # (after counting the rows, as the step is negative)
+        self.assertEqual(requests, [{"Page": 0, "PageSize": 1}, {"Page": 3500, "PageSize": 1}, {"Page": 5000, "PageSize": 1}])
+
+    @patch("telapi.rest.Client._send_request")
+    def test_slice_negative(self, mock):
+        requests = []
+        mock.side_effect = fake_pages(1098, requests=requests)
+
+        calls = self.client.accounts[self.client.account_sid].calls
+
+        self.assertEqual([call.sid for call in calls[-3:]], ["CA%032d" % i for i in range(1095, 1098)])
+        self.assertEqual([call.sid for call in calls[-1:-4:-1]], ["CA%032d" % i for i in range(1097, 1094, -1)])
+
+        # Slices of slices stay relative to the parent slice
+        self.assertEqual([call.sid for call in calls[100:200][-2:]], ["CA%032d" % i for i in range(198, 200)])
+
+        # Empty slices don't hit the API
+        del requests[:]
+        self.assertEqual(list(calls[5:1]), [])
+        self.assertEqual(requests, [])
+
+    @patch("telapi.rest.Client._send_request")
+    def test_iter_all(self, mock):
+        requests = []
+        mock.side_effect = fake_pages(10, requests=requests)
+
+        calls = self.client.accounts[self.client.account_sid].calls
+
+        self.assertEqual([call.sid for call in calls.iter_all(page_size=3)], ["CA%032d" % i for i in range(10)])
+        self.assertEqual([r["Page"] for r in requests], [0, 1, 2, 3])
+
+        # Stopping early doesn't walk the remaining pages
+        del requests[:]
+        stream = calls.stream(page_size=3, prefetch=1)
+        self.assertEqual(next(stream).sid, "CA%032d" % 0)
+        stream.close()
+        self.assertTrue(len(requests) <= 3)
+
+    @patch("telapi.rest.Client._send_request")
+    def test_iter_all_error(self, mock):
+        mock.side_effect = rest.exceptions.RequestError("Error code 500", http_code=500)
+
+        with self.assertRaises(rest.exceptions.RequestError):
+            list(self.client.accounts[self.client.account_sid].calls.iter_all())
+
+    @patch("telapi.rest.Client._send_request")
+    def test_export(self, mock):
+        requests = []
+        mock.side_effect = fake_pages(10, requests=requests)
+        calls = self.client.accounts[self.client.account_sid].calls.filter(To="+17325551234")
+
+        output = StringIO()
+        self.assertEqual(calls.export(output, page_size=3), 10)
+        self.assertEqual([json.loads(line)["sid"] for line in output.getvalue().splitlines()],
+            ["CA%032d" % i for i in range(10)])
+        self.assertTrue(all(r["To"] == "+17325551234" for r in requests))
+
+        output = StringIO()
+        calls.export(output, format="csv", fields=["sid", "status"], page_size=3)
+        rows = list(csv.reader(StringIO(output.getvalue())))
+        self.assertEqual(rows[0], ["sid", "status"])
+        self.assertEqual(rows[1:], [["CA%032d" % i, ""] for i in range(10)])
+
+        with self.assertRaises(ValueError):
+            calls.export(StringIO(), format="xml")
+
+    @patch("telapi.rest.Client._send_request")
+    def test_export_resume(self, mock):
+        pages = fake_pages(10)
+        mock.side_effect = pages
+        calls = self.client.accounts[self.client.account_sid].calls
+
+        expected = StringIO()
+        calls.export(expected, format="csv", compress=True, page_size=3)
+
+        # Crash while fetching the third page, then resume from the last checkpoint
+        def crash(resource_uri, method, params=None):
+            if params["Page"] == 2:
+                raise rest.exceptions.RequestError("Error code 500", http_code=500)
+            return pages(resource_uri, method, params)
+
+        mock.side_effect = crash
+        checkpoints = []
+        output = StringIO()
+
+        def checkpoint(page):
+            checkpoints.append((page, output.tell()))
+
+        with self.assertRaises(rest.exceptions.RequestError):
+            calls.export(output, format="csv", compress=True, page_size=3, checkpoint=checkpoint)
+        self.assertEqual(checkpoints[-1][0], 2)
+
+        mock.side_effect = pages
+        page, size = checkpoints[-1]
+        output.truncate(size)
+        calls.export(output, format="csv", compress=True, page_size=3, start_page=page)
+
+        read = lambda data: gzip.GzipFile(fileobj=StringIO(data)).read()
+        self.assertEqual(read(output.getvalue()), read(expected.getvalue()))
+        self.assertEqual(len(read(output.getvalue()).splitlines()), 11)
+
+    def _call_pages(self, total):
+        def send_request(resource_uri, method, params=None):
+            resource_data = fake_pages(total)(resource_uri, method, params)
+
+            for item in resource_data["calls"]:
+                i = int(item["sid"][2:])
+                item.update({"duration": str(i) if i % 4 else "", "price": "0.%06d" % i, "status": "completed",
+                    "date_created": "Tue, 19 Feb 2013 21:53:%02d +0000" % i})
+
+            return resource_data
+
+        return send_request
+
+    @unittest.skipUnless(numpy, "requires numpy")
+    @patch("telapi.rest.Client._send_request")
+    def test_to_columns(self, mock):
+        mock.side_effect = self._call_pages(10)
+        calls = self.client.accounts[self.client.account_sid].calls
+
+        columns = calls.to_columns(["sid", "duration", "price", "date_created", "status"], page_size=3)
+
+        self.assertEqual(len(columns), 10)
+        self.assertEqual(columns["duration"].dtype, numpy.dtype("i8"))
+        self.assertEqual(list(columns["duration"][:5]), [0, 1, 2, 3, 0])
+        self.assertAlmostEqual(columns["price"].sum(), 0.000045)
+        self.assertEqual(columns["date_created"][3], numpy.datetime64("2013-02-19T21:53:03"))
+        self.assertEqual(columns["sid"][9], "CA%032d" % 9)
+
+    @patch("telapi.rest.Client._send_request")
+    def test_to_columns_without_numpy(self, mock):
+        mock.side_effect = self._call_pages(10)
+        calls = self.client.accounts[self.client.account_sid].calls
+
+        with patch("telapi.rest.columns._import_numpy", lambda: None):
+            columns = calls.to_columns(["sid", "duration", "date_created", "status"], page_size=3)
+
+        self.assertEqual(columns.keys(), ["sid", "duration", "date_created", "status"])
+        self.assertEqual(columns["duration"].tolist()[:5], [0, 1, 2, 3, 0])
+        self.assertEqual(columns["date_created"][3], 1361310783.0)
+        self.assertEqual(columns["status"], ["completed"] * 10)
+
+    def test_parse_timestamp(self):
+        self.assertEqual(parse_timestamp("Tue, 19 Feb 2013 21:53:21 +0000"), 1361310801)
+        self.assertEqual(parse_timestamp("Tue, 19 Feb 2013 16:53:21 -0500"), 1361310801)
+        self.assertEqual(parse_timestamp("Tue, 5 Feb 2013 21:53:21 +0000"), 1360101201)
+        self.assertEqual(parse_timestamp(""), None)
+
+    @patch("telapi.rest.Client._send_request")
+    def test_sync(self, mock):
+        # Newest first, one call a minute
+        calls_data = []
+
+        def add_calls(count):
+            for i in range(len(calls_data), len(calls_data) + count):
+                calls_data.insert(0, {"sid": "CA%032d" % i, "date_updated": "1",
+                    "date_created": "Tue, 19 Feb 2013 %02d:%02d:00 +0000" % (i // 60, i % 60)})
+
+        requests = []
+
+        def send_request(resource_uri, method, params=None):
+            requests.append(params["Page"])
+            start = params["Page"] * params["PageSize"]
+            page = calls_data[start:start + params["PageSize"]]
+
+            # A call arriving mid-sync pushes the rest of the list one place down
+            if params["Page"] == 1 and len(calls_data) == 13:
+                add_calls(1)
+
+            return {"total": len(calls_data), "start": start, "end": start + len(page) - 1, "calls": page}
+
+        mock.side_effect = send_request
+        calls = self.client.accounts[self.client.account_sid].calls
+        state_path = os.path.join(tempfile.mkdtemp(), "calls-sync.json")
+
+        add_calls(10)
+        self.assertEqual(len(list(calls.sync(state_path, page_size=4))), 10)
+        self.assertEqual(requests, [0, 1, 2])
+
+        # Only the new calls, reading only as far back as the watermark
+        del requests[:]
+        add_calls(3)
+        sids = [call.sid for call in calls.sync(state_path, page_size=4)]
+        self.assertEqual(sids, ["CA%032d" % i for i in (12, 11, 10)])
+        self.assertEqual(requests, [0, 1])
+
+        # The call added while paging is picked up next time, nothing is repeated
+        sids = [call.sid for call in calls.sync(state_path, page_size=4)]
+        self.assertEqual(sids, ["CA%032d" % 13])
+        self.assertEqual(list(calls.sync(state_path, page_size=4)), [])
+
+        # Within the lookback window, updated calls come back
+        state_path = os.path.join(tempfile.mkdtemp(), "calls-sync.json")
+        self.assertEqual(len(list(calls.sync(state_path, lookback=300, page_size=4))), 14)
+
+        calls_data[2]["date_updated"] = "2"
+        calls_data[10]["date_updated"] = "2"
+        sids = [call.sid for call in calls.sync(state_path, lookback=300, page_size=4)]
+        self.assertEqual(sids, ["CA%032d" % 11])
+
+        with self.assertRaises(AttributeError):
+            list(self.client.accounts[self.client.account_sid].usages.sync(state_path))
+
+    def test_mirror(self):
+        page = open('mock-response/list-calls.json').read()
+        call = open('mock-response/view-call.json').read()
+        session = FakeSession([FakeResponse(200, page), FakeResponse(200, call)])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session,
+            mirror=rest.Mirror())
+        calls = client.accounts[self.test_sid].calls
+
+        fetched = [c.sid for c in calls]
+        viewed = calls[json.loads(call)["sid"]]
+        viewed.fetch()
+        self.assertEqual(len(session.requests), 2)
+
+        # Answered offline, as the same classes
+        stored = calls.query()
+        self.assertEqual(set(c.sid for c in stored), set(fetched) | set([viewed.sid]))
+        self.assertEqual(stored[0].__class__.__name__, 'Call')
+        self.assertEqual(len(session.requests), 2)
+
+        first = json.loads(page)["calls"][0]
+        matches = calls.query(to_number=first["to"], status=first["status"], date_created=first["date_created"])
+        self.assertTrue(first["sid"] in [c.sid for c in matches])
+        self.assertEqual(matches[0].subresource_uris, first["subresource_uris"])
+
+        self.assertEqual(calls.query(where='date_created > ?', params=(2000000000,)), [])
+        self.assertEqual(len(calls.query(limit=1)), 1)
+        self.assertEqual(client.accounts["AC" + "0" * 32].calls.query(), [])
+
+        with self.assertRaises(AttributeError):
+            calls.query(colour="red")
+
+        with self.assertRaises(rest.exceptions.RestError):
+            self.client.accounts[self.test_sid].calls.query()
+
+    def test_mirror_save(self):
+        sent = open('mock-response/send-sms.json').read()
+        session = FakeSession([FakeResponse(200, sent)])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session,
+            mirror=rest.Mirror())
+        sms_messages = client.accounts[self.test_sid].sms_messages
+
+        # Created resources are in the mirror without being listed first
+        sms = sms_messages.create(from_number=self.test_number, to_number=self.test_number, body="Hi")
+        self.assertEqual([stored.sid for stored in sms_messages.query()], [sms.sid])
+        self.assertEqual(len(session.requests), 1)
+
+    def test_identity_map(self):
+        account = open('mock-response/view-account.json').read()
+        session = FakeSession([FakeResponse(200, account), FakeResponse(200, account)])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session)
+
+        first = client.accounts[self.test_sid]
+        self.assertFalse(client.accounts is client.accounts)
+        self.assertTrue(client.accounts[self.test_sid] is first)
+        self.assertFalse(client.accounts[self.test_sid].calls is first.calls)
+
+        first.friendly_name
+        client.accounts[self.test_sid].friendly_name
+        self.assertEqual(len(session.requests), 1)
+        self.assertEqual((client.identity_map.hits, client.identity_map.misses), (3, 1))
+
+        # Invalidating hands out a fresh object, which fetches again
+        client.identity_map.invalidate("Accounts/%s" % self.test_sid)
+        second = client.accounts[self.test_sid]
+        self.assertFalse(second is first)
+        second.friendly_name
+        self.assertEqual(len(session.requests), 2)
+
+        # Objects nobody holds on to are dropped
+        del first, second
+        self.assertFalse("Accounts/%s" % self.test_sid in client.identity_map)
+
+    def test_root_list_refresh(self):
+        one = '{"total": 1, "start": 0, "end": 0, "accounts": [{"sid": "AC1"}]}'
+        two = '{"total": 2, "start": 0, "end": 1, "accounts": [{"sid": "AC1"}, {"sid": "AC2"}]}'
+        session = FakeSession([FakeResponse(200, one), FakeResponse(200, two)])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session)
+
+        # Holding on to a root list doesn't keep later accesses on its fetched page
+        accounts = client.accounts
+        self.assertEqual([account.sid for account in accounts], ["AC1"])
+        self.assertEqual([account.sid for account in client.accounts], ["AC1", "AC2"])
+
+    @patch("telapi.rest.Client._send_request")
+    def test_subresource_refresh(self, mock):
+        mock.side_effect = fake_pages(3)
+        account = self.client.accounts[self.client.account_sid]
+        self.assertEqual(len([call.sid for call in account.calls]), 3)
+
+        # Every access hands out a new list, which sees calls made since the last one
+        mock.side_effect = fake_pages(7)
+        self.assertEqual(len([call.sid for call in account.calls]), 7)
+        self.assertEqual(len([call.sid for call in self.client.accounts[self.client.account_sid].calls]), 7)
+
+    def test_identity_map_delete(self):
+        session = FakeSession([FakeResponse(200, '{}')])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session)
+        calls = client.accounts[self.test_sid].calls
+
+        call = calls["CA123"]
+        call.delete()
+        self.assertFalse(calls["CA123"] is call)
+
+    def test_single_flight(self):
+        call = open('mock-response/view-call.json').read()
+        session = BlockingSession([FakeResponse(200, call), FakeResponse(200, call)])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session)
+        url = "Accounts/%s/Calls/CA1.json" % self.test_sid
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(client._get(url))) for i in range(10)]
+        for thread in threads:
+            thread.start()
+
+        wait_for(lambda: client.single_flight.coalesced == 9)
+        session.release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(session.requests), 1)
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual((client.single_flight.calls, client.single_flight.coalesced), (1, 9))
+
+        # Once it has finished, the next request goes out again
+        client._get(url)
+        self.assertEqual(len(session.requests), 2)
+
+    def test_single_flight_error(self):
+        session = BlockingSession([FakeResponse(500, "")])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session)
+        errors = []
+
+        def fetch():
+            try:
+                client._get("Accounts/%s/Calls/CA1.json" % self.test_sid)
+            except rest.exceptions.RequestError, e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=fetch) for i in range(5)]
+        for thread in threads:
+            thread.start()
+
+        wait_for(lambda: client.single_flight.coalesced == 4)
+        session.release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 5)
+        self.assertEqual(len(session.requests), 1)
+
+    def test_single_flight_interrupted(self):
+        single_flight = rest.SingleFlight()
+
+        def interrupted():
+            raise KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            single_flight.do("key", interrupted)
+
+        # Later calls for the same key run rather than wait on the interrupted one
+        self.assertEqual(single_flight._inflight, {})
+        self.assertEqual(single_flight.do("key", lambda: 1), 1)
+
+    def test_single_flight_async(self):
+        call = open('mock-response/view-call.json').read()
+        session = BlockingSession([FakeResponse(200, call)])
+        client = rest.AsyncClient(account_sid=self.test_sid, auth_token=self.test_token, session=session,
+            concurrency=8)
+        calls = client.accounts[self.test_sid].calls
+
+        futures = [calls.new(sid="CA1").fetch() for i in range(8)]
+        wait_for(lambda: client.single_flight.coalesced == 7)
+        session.release.set()
+
+        self.assertEqual(set(call.status for call in client.gather(futures)), set([json.loads(call)["status"]]))
+        self.assertEqual(len(session.requests), 1)
+
+        # Turned off, every fetch goes out
+        session = FakeSession([FakeResponse(200, call), FakeResponse(200, call)])
+        client = rest.Client(account_sid=self.test_sid, auth_token=self.test_token, session=session, coalesce=False)
+        client._get("Accounts/%s/Calls/CA1.json" % self.test_sid)
+        client._get("Accounts/%s/Calls/CA1.json" % self.test_sid)
+        self.assertEqual(len(session.requests), 2)
+
+    @patch("telapi.rest.Client._send_request")
+    def test_records(self, mock):
+        mock.return_value = json.load(open('mock-response/list-calls.json','r'))
+
+        calls = self.client.accounts[self.client.account_sid].calls
+        records = list(calls.iter_all(records=True))
+        self.assertEqual(len(records), 3)
+
+        record = records[0]
+        self.assertEqual(record.__class__.__name__, 'CallRecord')
+        self.assertEqual(record.status, 'completed')
+        self.assertEqual(record.from_number, mock.return_value["calls"][0]["from"])
+        self.assertEqual(set(record.keys()), set(SCHEMA["rest_api"]["components"].get('calls')['attributes']))
+
+        with self.assertRaises(AttributeError):
+            record.status = 'failed'
+
+        # A record's values are just the attributes, not the list it came from
+        fields = SCHEMA["rest_api"]["components"].get('calls')['attributes']
+        self.assertEqual(len(record), len(fields))
+        self.assertEqual(list(record), [mock.return_value["calls"][0].get(name) for name in record._fields])
+        self.assertEqual(record[1], record.direction)
+
+        requests_made = mock.call_count
+        output = StringIO()
+        csv.writer(output).writerow(record)
+        self.assertEqual(len(next(csv.reader(StringIO(output.getvalue())))), len(fields))
+        self.assertEqual(mock.call_count, requests_made)
+
+        # Upgrading gives the same data as a full instance
+        call = record.instance()
+        self.assertEqual(call.__class__.__name__, 'Call')
+        self.assertEqual(call._url, calls[0]._url)
+        self.assertEqual(call.sid, record.sid)
+
+        mock.side_effect = fake_pages(10)
+        self.assertEqual([r.__class__.__name__ for r in calls.fetch_all(page_size=3, records=True)], ['CallRecord'] * 10)
+
+    @patch("telapi.rest.Client._send_request")
+    def test_fetch_all(self, mock):
+        requests = []
+        mock.side_effect = fake_pages(10, requests=requests)
+
+        calls = self.client.accounts[self.client.account_sid].calls
+        results = calls.fetch_all(concurrency=3, page_size=3)
+
+        self.assertEqual([call.sid for call in results], ["CA%032d" % i for i in range(10)])
+        self.assertEqual(sorted(r["Page"] for r in requests), [0, 1, 2, 3])
+        self.assertEqual(len(calls.page_latencies), 4)
+
+    @patch("telapi.rest.Client._send_request")
+    def test_fetch_all_error(self, mock):
+        pages = fake_pages(100)
+
+        def send_request(resource_uri, method, params=None):
+            if params["Page"] == 2:
+                raise rest.exceptions.RequestError("Error code 500", http_code=500)
+            return pages(resource_uri, method, params)
+
+        mock.side_effect = send_request
+
+        with self.assertRaises(rest.exceptions.RequestError):
+            self.client.accounts[self.client.account_sid].calls.fetch_all(concurrency=1, page_size=10)
+
+        # Pages after the failed one were never requested
+        self.assertEqual(mock.call_count, 3)
+
+    #
+    #  - Async -
+    #
+    @patch("telapi.rest.Client._send_request")
+    def test_async_client(self, mock):
+        client = rest.AsyncClient(account_sid=self.test_sid, auth_token=self.test_token, concurrency=4)
+
+        mock.return_value = json.load(open('mock-response/view-account.json','r'))
+        account = client.accounts[client.account_sid]
+        self.assertEqual(account.__class__.__name__, 'AsyncAccount')
+        self.assertTrue(isinstance(account.fetch(), rest.Future))
+        self.assertEqual(account.fetch().result().status, 'active')
+
+        mock.return_value = json.load(open('mock-response/send-sms.json','r'))
+        sms_messages = account.sms_messages
+        self.assertEqual(sms_messages.__class__.__name__, 'AsyncSMSMessageListResource')
+
+        futures = [sms_messages.create(from_number=self.test_number, to_number=self.test_number, body="Hi") for i in range(10)]
+        for sms in client.gather(futures):
+            self.assertEqual(sms.__class__.__name__, 'AsyncSMSMessage')
+            self.assertTrue(sms.sid.startswith('SM'))
+
+    @patch("telapi.rest.Client._send_request")
+    def test_async_gather(self, mock):
+        client = rest.AsyncClient(account_sid=self.test_sid, auth_token=self.test_token)
+        mock.side_effect = fake_pages(10)
+
+        calls = client.accounts[client.account_sid].calls
+        tasks = (lambda i=i: calls[i:i + 1].fetch() for i in range(10))
+        results = client.gather(tasks, concurrency=2)
+        self.assertEqual([result[0].sid for result in results], ["CA%032d" % i for i in range(10)])
+
+        mock.side_effect = rest.exceptions.RequestError("Error code 404", http_code=404)
+        errors = client.gather([calls[0:1].fetch()], return_exceptions=True)
+        self.assertEqual(errors[0].http_code, 404)
+
+    @patch("telapi.rest.Client._send_request")
+    def test_async_pages(self, mock):
+        client = rest.AsyncClient(account_sid=self.test_sid, auth_token=self.test_token)
+        requests = []
+        mock.side_effect = fake_pages(10, requests=requests)
+
+        calls = client.accounts[client.account_sid].calls
+
+        page = calls.fetch_page(2, page_size=3)
+        self.assertTrue(isinstance(page, rest.Future))
+        self.assertEqual([call.sid for call in page.result()], ["CA%032d" % i for i in range(6, 9)])
+
+        # A page's length is the number of items on it, not the row its last item is at
+        self.assertEqual(len(page.result()), 3)
+        last_page = calls.fetch_page(3, page_size=3).result()
+        self.assertEqual((len(last_page), len(list(last_page))), (1, 1))
+
+        del requests[:]
+        pages = list(calls.iter_pages(page_size=3, prefetch=2))
+        self.assertEqual([len(page.result()) for page in pages], [3, 3, 3, 1])
+        self.assertTrue(all(isinstance(page, rest.Future) for page in pages))
+        self.assertEqual([call.sid for page in client.gather(pages) for call in page], ["CA%032d" % i for i in range(10)])
+        self.assertEqual(sorted(r["Page"] for r in requests), [0, 1, 2, 3])
+
     #
     #  - Notifications -
     #